@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+from book import r, compile_book, leg_years, revalue_kind
+from linear_math import linear_pnl
+from lp_math import lp_value
+from pricing import intrinsic_value
+
+# Alert daemon: every position's legs live in one compiled book, indexed by underlying, so a tick on one
+# underlying only reprices that underlying's legs and folds the change into the affected positions.
+# Rules are vectorized threshold masks over all positions and fire on the edge (when a position enters
+# the alert zone), re-arming once it leaves.
+#   {"name": ..., "metric": "pnl" | "delta" | "breakeven_distance", "below" or "above": threshold}
+# breakeven_distance is |spot - nearest expiry breakeven| / spot, with each position tied to the underlying
+# of its first leg.
+
+METRICS = ("pnl", "delta", "breakeven_distance")
+
+
+# Build the daemon state for a book, spot prices per underlying and rules; breakevens are found on a +-grid around spot
+def build_daemon(book, spot, rules, sinks, today=None, grid_width=0.6, n_points=2000):
+    arrays = compile_book(book)
+    n_positions = len(arrays["positions"])
+    legs = {}
+    for kind in ("option", "linear", "lp"):
+        codes = arrays[kind]["underlying"]
+        legs[kind] = {code: np.flatnonzero(codes == code) for code in range(len(arrays["underlyings"]))}
+
+    # Underlying of each position (its first leg's) and its expiry breakevens on a relative grid around spot
+    position_underlying = np.full(n_positions, -1)
+    for kind in ("lp", "linear", "option"):
+        position_underlying[arrays[kind]["pos"][::-1]] = arrays[kind]["underlying"][::-1]
+    spot_by_code = np.array([spot[name] for name in arrays["underlyings"]], dtype=float)
+    x = np.linspace(-grid_width, grid_width, n_points)
+    expiry = np.zeros((n_positions, n_points))
+    opt, lin, lp = arrays["option"], arrays["linear"], arrays["lp"]
+    S = spot_by_code[opt["underlying"]][:, None] * (1 + x)
+    payoff = intrinsic_value(S, opt["strike"][:, None], opt["is_call"][:, None]) - opt["premium"][:, None]
+    np.add.at(expiry, opt["pos"], opt["qty"][:, None] * payoff)
+    S = spot_by_code[lin["underlying"]][:, None] * (1 + x)
+    pnl, _ = linear_pnl(lin["kind"][:, None], lin["entry"][:, None], lin["qty"][:, None], lin["liquidation"][:, None],
+                        lin["margin"][:, None], S, 0.0, r)
+    np.add.at(expiry, lin["pos"], pnl)
+    S = spot_by_code[lp["underlying"]][:, None] * (1 + x)
+    np.add.at(expiry, lp["pos"], lp_value(lp["L"][:, None], lp["lower"][:, None], lp["upper"][:, None], S)
+              - lp["initial"][:, None])
+    be_pos, i = np.nonzero(np.signbit(expiry[:, :-1]) != np.signbit(expiry[:, 1:]))
+    y0, y1 = expiry[be_pos, i], expiry[be_pos, i + 1]
+    be_x = x[i] - y0 * (x[i + 1] - x[i]) / (y1 - y0)
+    be_price = spot_by_code[position_underlying[be_pos]] * (1 + be_x)
+
+    state = {"arrays": arrays, "legs": legs, "today": today, "rules": rules, "sinks": sinks,
+             "position_underlying": position_underlying, "be_pos": be_pos, "be_price": be_price, "spot": {},
+             "leg_pnl": {kind: np.zeros(len(arrays[kind]["pos"])) for kind in legs},
+             "leg_delta": {kind: np.zeros(len(arrays[kind]["pos"])) for kind in legs},
+             "pnl": np.zeros(n_positions), "delta": np.zeros(n_positions),
+             "breakeven_distance": np.full(n_positions, np.inf),
+             "active": [np.zeros(n_positions, dtype=bool) for _ in rules], "alerts": 0}
+    for name, price in spot.items():
+        tick(state, name, price, check=False)
+    return state
+
+
+# PnL and delta of a subset of legs of one kind at a single spot
+def _price_legs(arrays, kind, idx, S, today):
+    leg = {field: values[idx] for field, values in arrays[kind].items()}
+    values = revalue_kind(kind, leg, S, leg_years(kind, leg, today), greeks=True)
+    return values["pnl"], values["delta"]
+
+
+# Apply one tick: reprice the underlying's legs, update its positions, then check the rules
+def tick(state, underlying, S, check=True):
+    arrays = state["arrays"]
+    if underlying not in arrays["underlyings"]:
+        return []
+    code = arrays["underlyings"].index(underlying)
+    state["spot"][underlying] = S
+    today = datetime.today() if state["today"] is None else state["today"]
+    n_positions = len(arrays["positions"])
+    for kind, by_code in state["legs"].items():
+        idx = by_code[code]
+        if not len(idx):
+            continue
+        pnl, delta = _price_legs(arrays, kind, idx, S, today)
+        pos = arrays[kind]["pos"][idx]
+        # Fold only the change of these legs into their positions
+        state["pnl"] += np.bincount(pos, pnl - state["leg_pnl"][kind][idx], minlength=n_positions)
+        state["delta"] += np.bincount(pos, delta - state["leg_delta"][kind][idx], minlength=n_positions)
+        state["leg_pnl"][kind][idx] = pnl
+        state["leg_delta"][kind][idx] = delta
+
+    on_underlying = state["position_underlying"][state["be_pos"]] == code
+    distance = np.full(n_positions, np.inf)
+    np.minimum.at(distance, state["be_pos"][on_underlying], np.abs(S - state["be_price"][on_underlying]) / S)
+    moved = state["position_underlying"] == code
+    state["breakeven_distance"][moved] = distance[moved]
+    return check_rules(state, moved) if check else []
+
+
+# Evaluate every rule as a mask over positions; emit alerts for positions that just entered the alert zone
+def check_rules(state, positions_mask=None):
+    fired = []
+    for rule, active in zip(state["rules"], state["active"]):
+        values = state[rule["metric"]]
+        hit = values < rule["below"] if "below" in rule else values > rule["above"]
+        if positions_mask is not None:
+            hit = np.where(positions_mask, hit, active)
+        new = np.flatnonzero(hit & ~active)
+        active[:] = hit
+        for p in new:
+            fired.append({"time": datetime.now().isoformat(timespec="seconds"), "rule": rule["name"],
+                          "position": state["arrays"]["positions"][p], "metric": rule["metric"],
+                          "value": float(values[p]), "spot": dict(state["spot"])})
+    for alert in fired:
+        for sink in state["sinks"]:
+            sink(alert)
+    state["alerts"] += len(fired)
+    return fired
+
+
+# Sink appending alerts as JSON lines to a log file
+def file_sink(path):
+    def sink(alert):
+        with open(path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+    return sink
+
+
+# Webhook sink: POST each alert as JSON; failures are logged and never stop the daemon
+def webhook_sink(url, timeout=2.0):
+    def sink(alert):
+        request = urllib.request.Request(url, data=json.dumps(alert).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=timeout).close()
+        except OSError as error:
+            logging.warning("Alert webhook %s failed: %s", url, error)
+    return sink
+
+
+# Run the daemon over a feed of {"underlying": ..., "spot": ...} ticks (see live.tail_feed); returns tick latencies
+async def run_daemon(state, feed, max_ticks=None):
+    latency = []
+    async for message in feed:
+        start = time.perf_counter()
+        tick(state, message.get("underlying", "ETH"), message["spot"])
+        latency.append(time.perf_counter() - start)
+        if max_ticks is not None and len(latency) >= max_ticks:
+            break
+    return latency
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from book import add_linear, add_lp, add_option, new_book
+
+    # python alerts.py [feed file] [alert log]; without a feed a random walk on ETH and BTC is replayed
+    rng = np.random.default_rng(21)
+    spot = {"ETH": 2620.0, "BTC": 64000.0}
+    book = new_book()
+    for i in range(3000):  # Short strangles, long straddles, LPs and perp hedges across two underlyings
+        underlying = "ETH" if i % 4 else "BTC"
+        S0, name = spot[underlying], f"Position {i}"
+        if i % 10 == 9:
+            add_lp(book, 10000, S0, S0 * 0.9, S0 * 1.1, position=name, underlying=underlying)
+            add_linear(book, S0, -2 * 10000 / S0, position=name, underlying=underlying, kind="perp", leverage=3)
+            continue
+        sign = -1 if i % 2 else 1
+        for kind, strike in (("put", S0 * 0.9), ("call", S0 * 1.1)):
+            add_option(book, kind, round(strike, -1), "03/26/2027", 0.6, S0 * 0.05, sign, position=name,
+                       underlying=underlying)
+    rules = [{"name": "loss over 1000", "metric": "pnl", "below": -1000},
+             {"name": "delta over 2", "metric": "delta", "above": 2},
+             {"name": "within 2% of breakeven", "metric": "breakeven_distance", "below": 0.02}]
+    sinks = [file_sink(sys.argv[2] if len(sys.argv) > 2 else "alerts.log")]
+    state = build_daemon(book, spot, rules, sinks)
+    check_rules(state)  # Positions already in an alert zone fire once at start
+
+    async def replay():
+        for step in range(600):
+            name = "ETH" if step % 3 else "BTC"
+            spot[name] *= np.exp(rng.normal(0, 0.004))
+            yield {"underlying": name, "spot": spot[name]}
+
+    if len(sys.argv) > 1 and sys.argv[1]:
+        from live import tail_feed
+        feed = tail_feed(sys.argv[1])
+    else:
+        feed = replay()
+    latency = np.array(asyncio.run(run_daemon(state, feed))) * 1000
+    print(f"{len(latency)} ticks over {len(state['arrays']['positions'])} positions: "
+          f"median {np.median(latency):.2f} ms, max {latency.max():.2f} ms, {state['alerts']} alerts")
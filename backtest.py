@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from book import r
+from pricing import black_scholes_greeks, intrinsic_value
+from snapshot_store import _load_underlyings, expiry_block, iter_snapshots, locate
+from strategies import strategy_legs
+
+# Replays chain snapshots from snapshot_store and trades one rule set, e.g.
+#   {"name": "condor", "structure": "iron_condor", "underlying": "ETH", "dte": 30,
+#    "select": "delta", "targets": {"long_put": -0.05, "short_put": -0.15, "short_call": 0.15, "long_call": 0.05},
+#    "num_contracts": 1, "max_open": 1, "entry_every_days": 7, "profit_take": 0.5, "stop_loss": 2.0, "exit_dte": 2}
+# select "offset" picks the strike nearest spot * (1 + target) instead of the nearest delta.
+# Longs are bought at the ask and shorts sold at the bid (mark when a side is missing); open legs are marked
+# at mark, expired legs at intrinsic value. All open legs are marked with one lookup per snapshot.
+
+LEG_FIELDS = ("pos", "expiry", "is_call", "strike", "qty", "entry", "mark")
+
+
+# Empty set of open legs
+def _no_legs():
+    return {"pos": np.empty(0, np.int64), "expiry": np.empty(0, "datetime64[D]"), "is_call": np.empty(0, bool),
+            "strike": np.empty(0), "qty": np.empty(0), "entry": np.empty(0), "mark": np.empty(0)}
+
+
+# Pick an expiry and strikes for a new position from one snapshot; None when the chain cannot fill it
+def select_legs(columns, code, spot, timestamp, rules):
+    today = timestamp.astype("datetime64[D]")
+    rows = slice(*np.searchsorted(columns["underlying"], [code, code + 1]))
+    expiries = np.unique(columns["expiry"][rows])
+    dte = (expiries - today).astype(int)
+    candidates = expiries[dte > 0]
+    if len(candidates) == 0:
+        return None
+    expiry = candidates[np.argmin(np.abs((candidates - today).astype(int) - rules["dte"]))]
+    T = (expiry - today).astype(int) / 365.0
+
+    legs = []
+    for name, kind, qty in strategy_legs(rules["structure"], rules.get("num_contracts", 1)):
+        block = expiry_block(columns, expiry, code, kind)
+        strikes, iv = columns["strike"][block], columns["iv"][block]
+        if len(strikes) == 0:
+            return None
+        target = rules["targets"][name]
+        if rules.get("select", "delta") == "delta":
+            _, delta, _, _ = black_scholes_greeks(spot, strikes, T, r, iv, kind == "call")
+            distance = np.abs(delta - target)
+            if np.isnan(distance).all():  # No quoted IV at this expiry: skip the snapshot
+                return None
+            i = np.nanargmin(distance)
+        else:
+            i = np.argmin(np.abs(strikes - spot * (1 + target)))
+        side = columns["ask"][block][i] if qty > 0 else columns["bid"][block][i]
+        price = side if np.isfinite(side) and side > 0 else columns["mark"][block][i]
+        if not np.isfinite(price):
+            return None
+        legs.append((expiry, kind == "call", strikes[i], qty, price))
+    return legs
+
+
+# Run one rule set over [t0, t1]; returns the equity curve and closed trades
+def run_backtest(root, rules, t0, t1):
+    code = _load_underlyings(root).index(rules.get("underlying", "ETH"))
+    legs = _no_legs()
+    basis = np.empty(0)  # Premium paid or received per open position, scales profit take / stop loss
+    opened = np.empty(0, "datetime64[s]")
+    next_id, last_entry, realized = 0, None, 0.0
+    timestamps, equity, trades = [], [], []
+    entry_every = np.timedelta64(int(rules.get("entry_every_days", 7) * 86400), "s")
+
+    for timestamp, columns in iter_snapshots(root, t0, t1):
+        rows = slice(*np.searchsorted(columns["underlying"], [code, code + 1]))
+        spot = np.nanmedian(columns["underlying_price"][rows]) if rows.stop > rows.start else np.nan
+        today = timestamp.astype("datetime64[D]")
+
+        if len(legs["pos"]):
+            found = locate(columns, code, legs["expiry"], legs["is_call"], legs["strike"])
+            marks = np.where(found >= 0, columns["mark"][np.maximum(found, 0)], legs["mark"])
+            expired = legs["expiry"] <= today
+            if np.isfinite(spot):
+                marks = np.where(expired, intrinsic_value(spot, legs["strike"], legs["is_call"]), marks)
+            legs["mark"] = np.where(np.isfinite(marks), marks, legs["mark"])
+
+            ids, leg_position = np.unique(legs["pos"], return_inverse=True)
+            pnl = np.bincount(leg_position, weights=legs["qty"] * (legs["mark"] - legs["entry"]), minlength=len(ids))
+            starts = np.flatnonzero(np.r_[True, np.diff(leg_position) != 0])
+            dte = np.minimum.reduceat(legs["expiry"].astype(int), starts) - today.astype(int)
+            close = dte <= rules.get("exit_dte", 0)
+            if "profit_take" in rules:
+                close |= pnl >= rules["profit_take"] * basis
+            if "stop_loss" in rules:
+                close |= pnl <= -rules["stop_loss"] * basis
+            if close.any():
+                realized += pnl[close].sum()
+                for i in np.flatnonzero(close):
+                    trades.append({"opened": opened[i], "closed": timestamp, "pnl": float(pnl[i])})
+                keep = ~close[leg_position]
+                legs = {name: values[keep] for name, values in legs.items()}
+                basis, opened = basis[~close], opened[~close]
+
+        can_open = len(basis) < rules.get("max_open", 1) and np.isfinite(spot)
+        if can_open and (last_entry is None or timestamp - last_entry >= entry_every):
+            new = select_legs(columns, code, spot, timestamp, rules)
+            if new is not None:
+                expiry, is_call, strike, qty, price = (np.array(v) for v in zip(*new))
+                added = {"pos": np.full(len(new), next_id), "expiry": expiry.astype("datetime64[D]"),
+                         "is_call": is_call, "strike": strike.astype(float), "qty": qty.astype(float),
+                         "entry": price.astype(float), "mark": price.astype(float)}
+                legs = {name: np.concatenate([legs[name], added[name]]) for name in LEG_FIELDS}
+                basis = np.append(basis, abs(np.sum(qty * price)))
+                opened = np.append(opened, timestamp)
+                next_id, last_entry = next_id + 1, timestamp
+
+        unrealized = np.sum(legs["qty"] * (legs["mark"] - legs["entry"]))
+        timestamps.append(timestamp)
+        equity.append(realized + unrealized)
+
+    return {"name": rules.get("name", rules["structure"]), "timestamps": np.array(timestamps, "datetime64[s]"),
+            "equity": np.array(equity), "trades": trades}
+
+
+# Run independent rule sets in parallel worker processes
+def run_backtests(root, rule_sets, t0, t1, workers=None):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_backtest, root, rules, t0, t1) for rules in rule_sets]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    import sys
+
+    import matplotlib.pyplot as plt
+
+    # Backtest the standard structures over a snapshot store: python backtest.py <root> <t0> <t1>
+    root, t0, t1 = sys.argv[1], sys.argv[2], sys.argv[3]
+    rule_sets = [
+        {"name": "Iron Condor 30 DTE", "structure": "iron_condor", "dte": 30, "select": "delta",
+         "targets": {"long_put": -0.05, "short_put": -0.15, "short_call": 0.15, "long_call": 0.05},
+         "profit_take": 0.5, "stop_loss": 2.0, "exit_dte": 2},
+        {"name": "Short Strangle 30 DTE", "structure": "short_strangle", "dte": 30, "select": "delta",
+         "targets": {"short_put": -0.15, "short_call": 0.15}, "profit_take": 0.5, "stop_loss": 2.0, "exit_dte": 2},
+        {"name": "Call Ratio Spread 14 DTE", "structure": "call_ratio_spread", "dte": 14, "select": "offset",
+         "targets": {"long_call": 0.02, "short_call": 0.10}, "exit_dte": 1},
+    ]
+    results = run_backtests(root, rule_sets, t0, t1)
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    for result in results:
+        ax.plot(result["timestamps"], result["equity"], label=f"{result['name']} ({len(result['trades'])} trades)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Profit / Loss")
+    ax.axhline(0, color='black', lw=0.5)
+    ax.legend(fontsize=9)
+    ax.grid(True)
+    plt.show()
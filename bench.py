@@ -0,0 +1,256 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from book import book_from_spec, breakevens, compile_book, evaluate_book
+from lp_math import lp_liquidity, lp_value
+from pricing import black_scholes, black_scholes_greeks
+from strategies import SCRIPTS
+
+# Benchmark suite: python bench.py [--quick] [--filter text] [--save out.json] [--compare baseline.json]
+# Every benchmark runs with fixed inputs (seeded legs, BENCH_TODAY), so runs are comparable across commits.
+# Results are the best time per call over several repeats, stored as {"meta": ..., "results": {name: seconds}}.
+
+BENCH_TODAY = datetime(2024, 6, 1)  # Before every script's expiry, so all option legs are live
+SEED = 0
+GRID_SIZES = (400, 10_000, 100_000, 1_000_000)
+LEG_COUNTS = (1, 10, 100)
+QUICK_GRID_SIZES = (400, 10_000)
+MAX_CELLS = 10_000_000  # Skip leg x grid combinations above this many cells
+IMPORT_MODULES = ("pricing", "book", "report", "graph")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Best seconds per call of func: calls are batched until a batch takes min_time, then repeated
+def time_call(func, repeat=5, min_time=0.05):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# Random option legs with a fixed seed, as (n_legs, 1) columns ready to broadcast against a grid
+def _random_legs(n_legs, seed=SEED):
+    rng = np.random.default_rng(seed)
+    return {"K": rng.uniform(2000, 3500, (n_legs, 1)), "T": rng.uniform(0.02, 1.0, (n_legs, 1)),
+            "sigma": rng.uniform(0.4, 1.0, (n_legs, 1)), "is_call": rng.random((n_legs, 1)) < 0.5}
+
+
+# Kernel benchmarks: Black-Scholes price and price + Greeks over grid sizes x leg counts
+def kernel_benchmarks(grid_sizes):
+    cases = {}
+    for n in grid_sizes:
+        S = np.linspace(1500, 4000, n)[None, :]
+        for n_legs in LEG_COUNTS:
+            if n * n_legs > MAX_CELLS:
+                continue
+            legs = _random_legs(n_legs)
+            cases[f"black_scholes/{n_legs}legs/{n}"] = (
+                lambda S=S, legs=legs: black_scholes(S, legs["K"], legs["T"], 0.01, legs["sigma"], legs["is_call"]))
+            cases[f"black_scholes_greeks/{n_legs}legs/{n}"] = (
+                lambda S=S, legs=legs: black_scholes_greeks(S, legs["K"], legs["T"], 0.01, legs["sigma"],
+                                                            legs["is_call"]))
+    return cases
+
+
+# Payoff construction for every strategy script: compile the spec and evaluate the book on its own price range
+def script_benchmarks(grid_sizes):
+    cases = {}
+    for name, spec in SCRIPTS.items():
+        for n in grid_sizes[:2]:
+            S = np.linspace(spec["lower_range"], spec["upper_range"], n)
+            cases[f"script/{name}/{n}"] = lambda spec=spec, S=S: evaluate_book(compile_book(book_from_spec(spec)), S,
+                                                                               BENCH_TODAY)
+    return cases
+
+
+# The scripts' table path: 18 evenly spaced prices plus strikes and breakevens, interpolated from both curves
+def table_benchmarks(grid_sizes):
+    cases = {}
+    spec = SCRIPTS["short_straddle.py"]
+    for n in grid_sizes:
+        S = np.linspace(spec["lower_range"], spec["upper_range"], n)
+        result = evaluate_book(compile_book(book_from_spec(spec)), S, BENCH_TODAY)
+
+        def table(S=S, result=result):
+            prices = np.linspace(S[0], S[-1], 18)
+            prices = np.unique(np.concatenate([prices, [2425], breakevens(S, result["expiry_pnl"])]))
+            return np.interp(prices, S, result["expiry_pnl"]), np.interp(prices, S, result["current_pnl"])
+        cases[f"table_interp/{n}"] = table
+    return cases
+
+
+# univ3.py's per-price Python loop (get_L once, then get_new_WETH_amount / get_new_USDC_amount per price)
+# against lp_math's vectorized value on the same prices
+def univ3_benchmarks(grid_sizes):
+    initial_investment, current_price, lower_bound, upper_bound = 10000, 2336, 2150, 2600
+
+    def univ3_loop(prices):
+        pricing_formula = ((np.sqrt(current_price) - np.sqrt(lower_bound))
+                           / ((1 / np.sqrt(current_price)) - (1 / np.sqrt(upper_bound))))
+        amount_WETH = initial_investment / (current_price + pricing_formula)
+        amount_USDC = amount_WETH * pricing_formula
+        L = min(amount_WETH * (np.sqrt(upper_bound) * np.sqrt(current_price))
+                / (np.sqrt(upper_bound) - np.sqrt(current_price)),
+                amount_USDC / (np.sqrt(current_price) - np.sqrt(lower_bound)))
+        values = []
+        for price in prices:
+            pool_price = min(max(price, lower_bound), upper_bound)
+            weth = L / np.sqrt(pool_price) - L / np.sqrt(upper_bound)
+            usdc = L * np.sqrt(pool_price) - L * np.sqrt(lower_bound)
+            values.append(weth * price + usdc)
+        return values
+
+    cases = {}
+    L = lp_liquidity(initial_investment, current_price, lower_bound, upper_bound)
+    for n in grid_sizes:
+        prices = np.linspace(lower_bound - 200, upper_bound, n)
+        if n <= 100_000:
+            cases[f"univ3_loop/{n}"] = lambda prices=prices: univ3_loop(prices)
+        cases[f"lp_value/{n}"] = lambda prices=prices: lp_value(L, lower_bound, upper_bound, prices)
+    return cases
+
+
+# Figure rendering to PNG with the Agg backend: both payoff curves plus the 18-column table
+def render_benchmarks(grid_sizes):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    spec = SCRIPTS["short_straddle.py"]
+    cases = {}
+    for n in grid_sizes:
+        S = np.linspace(spec["lower_range"], spec["upper_range"], n)
+        result = evaluate_book(compile_book(book_from_spec(spec)), S, BENCH_TODAY)
+
+        def render(S=S, result=result):
+            fig, ax = plt.subplots(figsize=(14, 8))
+            ax.plot(S, result["expiry_pnl"], color='black')
+            ax.plot(S, result["current_pnl"], linestyle='dotted', color='purple')
+            prices = np.linspace(S[0], S[-1], 18)
+            ax.table(cellText=[np.round(np.interp(prices, S, result["expiry_pnl"]), 2),
+                               np.round(np.interp(prices, S, result["current_pnl"]), 2)],
+                     colLabels=np.round(prices, 2), loc='bottom', bbox=[0, -0.3, 1, 0.2])
+            fig.savefig(io.BytesIO(), format="png")
+            plt.close(fig)
+        cases[f"render/{n}"] = render
+    return cases
+
+
+# Whole-process startup: a table-only report.py run against the legacy script it replaces (Agg, so show() returns)
+def startup_benchmarks(grid_sizes):
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONWARNINGS="ignore")
+
+    def run_script(*args):
+        subprocess.run([sys.executable, *args], cwd=HERE, env=env, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+    # Both report runs price on BENCH_TODAY, so they do the same (live option) work as the legacy script
+    today = BENCH_TODAY.date().isoformat()
+    return {"startup/report_text": lambda: run_script("report.py", "short_straddle.py", "--today", today),
+            "startup/report_csv": lambda: run_script("report.py", "short_straddle.py", "--format", "csv",
+                                                     "--today", today),
+            "startup/legacy_short_straddle": lambda: run_script("short_straddle.py")}
+
+
+# Cumulative import time of a module in a fresh interpreter, from -X importtime (seconds)
+def import_time(module):
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=HERE,
+                               capture_output=True, text=True, check=True)
+    for line in reversed(completed.stderr.splitlines()):
+        if line.startswith("import time:") and line.rsplit("|", 1)[1].strip() == module:
+            return int(line.split("|")[1]) / 1e6
+    raise ValueError(f"No import time reported for {module}")
+
+
+SUITES = (kernel_benchmarks, script_benchmarks, table_benchmarks, univ3_benchmarks, render_benchmarks,
+          startup_benchmarks)
+
+
+# Run every benchmark whose name contains name_filter; returns the results document
+def run(grid_sizes=GRID_SIZES, name_filter=None, repeat=5, verbose=True):
+    results = {}
+    for suite in SUITES:
+        for name, func in suite(grid_sizes).items():
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = time_call(func, repeat)
+            if verbose:
+                print(f"{name:<56} {results[name] * 1000:>12.4f} ms")
+    # Import times are single fresh-interpreter measurements, best of repeat
+    for module in IMPORT_MODULES:
+        name = f"importtime/{module}"
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = min(import_time(module) for _ in range(repeat))
+        if verbose:
+            print(f"{name:<56} {results[name] * 1000:>12.4f} ms")
+    meta = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "run_at": datetime.now().isoformat(timespec="seconds"),
+            "bench_today": BENCH_TODAY.isoformat(), "seed": SEED, "grid_sizes": list(grid_sizes)}
+    return {"meta": meta, "results": results}
+
+
+# Comparison rows (name, baseline, current, ratio) for benchmarks present in both runs, plus regressions over threshold
+def compare(baseline, current, threshold=1.10):
+    rows, regressions = [], []
+    for name, seconds in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = seconds / baseline["results"][name]
+        rows.append((name, baseline["results"][name], seconds, ratio))
+        if ratio > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+# Text report of a comparison
+def format_comparison(rows, regressions, threshold):
+    lines = [f"{'benchmark':<56} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}"]
+    for name, before, after, ratio in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        lines.append(f"{name:<56} {before * 1000:>12.4f} {after * 1000:>12.4f} {ratio:>7.2f}{flag}")
+    lines.append(f"{len(regressions)} of {len(rows)} benchmarks slower than {threshold:.2f}x the baseline")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pricing, payoff, table, LP and rendering paths")
+    parser.add_argument("--quick", action="store_true", help=f"only grid sizes {QUICK_GRID_SIZES}")
+    parser.add_argument("--filter", help="only benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.10, help="ratio above which a benchmark regressed")
+    args = parser.parse_args()
+
+    document = run(QUICK_GRID_SIZES if args.quick else GRID_SIZES, args.filter, args.repeat)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(document, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, document, args.threshold)
+        print()
+        print(format_comparison(rows, regressions, args.threshold))
+        raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,308 @@
+import json
+from datetime import datetime
+
+import numpy as np
+
+from instrument import enable_from_argv, stage
+from pricing import black_scholes, black_scholes_greeks, intrinsic_value
+from lp_math import lp_liquidity, lp_value, lp_delta, lp_gamma
+from linear_math import KINDS, liquidation_price, initial_margin, linear_pnl
+
+r = 0.01  # Risk-free rate
+DATE_FORMAT = "%m/%d/%Y"  # Expiration date format used by all the strategy scripts
+
+# A book holds three kinds of legs that share one price grid:
+#   option - Black-Scholes calls and puts (num_contracts < 0 for short legs)
+#   linear - spot, dated future or perp legs, PnL = (mark - entry_price) * amount
+#   lp     - Uniswap v3 positions (univ3.py)
+# Every leg belongs to a named position so results can be broken down per position.
+
+
+# Create an empty book
+def new_book():
+    return {"option": [], "linear": [], "lp": []}
+
+
+# Add a call or put leg; iv is a fraction (0.60), premium is per contract
+def add_option(book, kind, strike, expiration_date, iv, premium, num_contracts, position="default", underlying="ETH"):
+    if kind not in ("call", "put"):
+        raise ValueError(f"Unknown option kind: {kind}")
+    book["option"].append({"kind": kind, "strike": strike, "expiration_date": expiration_date, "iv": iv,
+                           "premium": premium, "num_contracts": num_contracts, "position": position,
+                           "underlying": underlying})
+    return book
+
+
+# Add a linear leg; amount < 0 for a short (shorteth.py uses amount = -amount_eth_shorted).
+# kind is "spot", "future" (needs expiration_date) or "perp"; funding_rate is annualized, paid by longs when positive.
+def add_linear(book, entry_price, amount, position="default", underlying="ETH", kind="spot", leverage=1,
+               maintenance_margin=0.005, funding_rate=0.0, expiration_date=None):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown linear kind: {kind}")
+    if kind == "future" and expiration_date is None:
+        raise ValueError("Dated futures need an expiration_date")
+    book["linear"].append({"entry_price": entry_price, "amount": amount, "position": position,
+                           "underlying": underlying, "kind": kind, "leverage": leverage,
+                           "maintenance_margin": maintenance_margin, "funding_rate": funding_rate,
+                           "expiration_date": expiration_date})
+    return book
+
+
+# Add a Uniswap v3 LP position opened with initial_investment at current_price
+def add_lp(book, initial_investment, current_price, lower_bound, upper_bound, position="default", underlying="ETH"):
+    book["lp"].append({"initial_investment": initial_investment, "current_price": current_price,
+                       "lower_bound": lower_bound, "upper_bound": upper_bound, "position": position,
+                       "underlying": underlying})
+    return book
+
+
+# Build a book from a JSON-style spec: {"legs": [{"type": "call" | "put" | "linear" | "lp", ...}]}
+def book_from_spec(spec):
+    with stage("parse"):
+        book = new_book()
+        for leg in spec["legs"]:
+            leg = dict(leg)
+            kind = leg.pop("type")
+            if kind in ("call", "put"):
+                add_option(book, kind, **leg)
+            elif kind == "linear":
+                add_linear(book, **leg)
+            elif kind == "lp":
+                add_lp(book, **leg)
+            else:
+                raise ValueError(f"Unknown leg type: {kind}")
+        return book
+
+
+# Load a book spec from a JSON file
+def load_book(path):
+    with open(path) as f:
+        return book_from_spec(json.load(f))
+
+
+# Parse "%m/%d/%Y" expiration dates (scalar or array) into datetime64[D], parsing each distinct date once
+def parse_expiry(dates):
+    unique_dates, inverse = np.unique(np.asarray(dates), return_inverse=True)
+    parsed = np.array([datetime.strptime(d, DATE_FORMAT) for d in unique_dates], dtype="datetime64[D]")
+    return parsed[inverse].reshape(np.shape(dates))
+
+
+# Years to expiration the way the scripts compute it: whole days from now / 365
+def years_to_expiry(expiry, today=None):
+    today = datetime.today() if today is None else today
+    days = (expiry.astype("datetime64[s]") - np.datetime64(today, "s")) // np.timedelta64(1, "D")
+    return days / 365.0
+
+
+# Convert a book into flat per-kind arrays; positions and underlyings are mapped to integer ids
+def compile_book(book):
+    with stage("parse"):
+        return _compile_book(book)
+
+
+# compile_book without the "parse" stage around it
+def _compile_book(book):
+    position_id, underlying_id = {}, {}
+    for kind in ("option", "linear", "lp"):
+        for leg in book[kind]:
+            position_id.setdefault(leg["position"], len(position_id))
+            underlying_id.setdefault(leg.get("underlying", "ETH"), len(underlying_id))
+    positions, underlyings = list(position_id), list(underlying_id)
+
+    options = book["option"]
+    linear = book["linear"]
+    lps = book["lp"]
+    return {
+        "positions": positions,
+        "underlyings": underlyings,
+        "option": {
+            "is_call": np.array([leg["kind"] == "call" for leg in options], dtype=bool),
+            "strike": np.array([leg["strike"] for leg in options], dtype=float),
+            "expiry": parse_expiry([leg["expiration_date"] for leg in options]),
+            "iv": np.array([leg["iv"] for leg in options], dtype=float),
+            "premium": np.array([leg["premium"] for leg in options], dtype=float),
+            "qty": np.array([leg["num_contracts"] for leg in options], dtype=float),
+            "pos": np.array([position_id[leg["position"]] for leg in options], dtype=np.intp),
+            "underlying": np.array([underlying_id[leg.get("underlying", "ETH")] for leg in options], dtype=np.intp),
+        },
+        "linear": _compile_linear(linear, position_id, underlying_id),
+        "lp": {
+            "L": lp_liquidity(np.array([leg["initial_investment"] for leg in lps], dtype=float),
+                              np.array([leg["current_price"] for leg in lps], dtype=float),
+                              np.array([leg["lower_bound"] for leg in lps], dtype=float),
+                              np.array([leg["upper_bound"] for leg in lps], dtype=float)),
+            "lower": np.array([leg["lower_bound"] for leg in lps], dtype=float),
+            "upper": np.array([leg["upper_bound"] for leg in lps], dtype=float),
+            "initial": np.array([leg["initial_investment"] for leg in lps], dtype=float),
+            "pos": np.array([position_id[leg["position"]] for leg in lps], dtype=np.intp),
+            "underlying": np.array([underlying_id[leg.get("underlying", "ETH")] for leg in lps], dtype=np.intp),
+        },
+    }
+
+
+# Linear legs as arrays, with margin and liquidation price precomputed
+def _compile_linear(linear, position_id, underlying_id):
+    kind = np.array([KINDS.index(leg.get("kind", "spot")) for leg in linear], dtype=np.int8)
+    entry = np.array([leg["entry_price"] for leg in linear], dtype=float)
+    qty = np.array([leg["amount"] for leg in linear], dtype=float)
+    leverage = np.array([leg.get("leverage", 1) for leg in linear], dtype=float)
+    maintenance_margin = np.array([leg.get("maintenance_margin", 0.005) for leg in linear], dtype=float)
+    expiry = np.full(len(linear), np.datetime64("NaT"), dtype="datetime64[D]")
+    dated = [i for i, leg in enumerate(linear) if leg.get("expiration_date")]
+    if dated:
+        expiry[dated] = parse_expiry([linear[i]["expiration_date"] for i in dated])
+    return {
+        "kind": kind,
+        "entry": entry,
+        "qty": qty,
+        "leverage": leverage,
+        "maintenance_margin": maintenance_margin,
+        "funding_rate": np.array([leg.get("funding_rate", 0.0) for leg in linear], dtype=float),
+        "expiry": expiry,
+        "margin": initial_margin(kind, entry, qty, leverage),
+        "liquidation": liquidation_price(kind, entry, qty, leverage, maintenance_margin),
+        "pos": np.array([position_id[leg["position"]] for leg in linear], dtype=np.intp),
+        "underlying": np.array([underlying_id[leg.get("underlying", "ETH")] for leg in linear], dtype=np.intp),
+    }
+
+
+# Years to expiry of one kind's compiled legs on date `when`; undated linear legs (spot, perp) and LP legs get 0
+def leg_years(kind, legs, when=None):
+    if kind == "option":
+        return years_to_expiry(legs["expiry"], when)
+    T = np.zeros(len(legs["pos"]))
+    if kind == "linear":
+        dated = ~np.isnat(legs["expiry"])
+        T[dated] = years_to_expiry(legs["expiry"][dated], when)
+    return T
+
+
+# Current PnL of one kind's legs at prices S with T years left (plus delta, gamma and vega with greeks=True).
+# Leg fields, S and T broadcast together as given; iv overrides the option legs' implied vols.
+def revalue_kind(kind, legs, S, T=0.0, greeks=False, iv=None):
+    if kind == "option":
+        iv, qty = legs["iv"] if iv is None else iv, legs["qty"]
+        with stage("price"):
+            if not greeks:
+                return {"pnl": qty * (black_scholes(S, legs["strike"], T, r, iv, legs["is_call"]) - legs["premium"])}
+            price, delta, gamma, vega = black_scholes_greeks(S, legs["strike"], T, r, iv, legs["is_call"])
+        return {"pnl": qty * (price - legs["premium"]), "delta": qty * delta, "gamma": qty * gamma,
+                "vega": qty * vega}
+    if kind == "linear":
+        pnl, delta = linear_pnl(legs["kind"], legs["entry"], legs["qty"], legs["liquidation"], legs["margin"], S, T, r)
+        zeros = np.zeros_like(pnl)
+        return {"pnl": pnl, "delta": delta, "gamma": zeros, "vega": zeros} if greeks else {"pnl": pnl}
+    L, lower, upper = legs["L"], legs["lower"], legs["upper"]
+    pnl = lp_value(L, lower, upper, S) - legs["initial"]
+    if not greeks:
+        return {"pnl": pnl}
+    return {"pnl": pnl, "delta": lp_delta(L, lower, upper, S), "gamma": lp_gamma(L, lower, upper, S),
+            "vega": np.zeros_like(pnl)}
+
+
+# Current PnL (plus delta, gamma and vega with greeks=True) of every leg of a compiled book on date `when`, legs
+# stacked as rows (option, linear, lp). S is one row of prices per leg in that order, or one row shared by all.
+# jump (years, broadcast against the price columns) shortens every expiry; iv overrides the option vols.
+def revalue_legs(arrays, S, when=None, greeks=False, jump=0.0, iv=None):
+    S = np.asarray(S, dtype=float)
+    S = S.reshape(1, -1) if S.ndim < 2 else S
+    rows, start = [], 0
+    for kind in ("option", "linear", "lp"):
+        legs = arrays[kind]
+        n = len(legs["pos"])
+        columns = {field: values[:, None] for field, values in legs.items()}
+        T = leg_years(kind, legs, when)[:, None] - jump
+        rows.append(revalue_kind(kind, columns, S if len(S) == 1 else S[start:start + n], T, greeks,
+                                 iv if kind == "option" else None))
+        start += n
+    return {key: np.vstack([values[key] for values in rows]) for key in rows[0]}
+
+
+# Per-leg PnL (expiry and current), delta and gamma on the price grid S, all legs stacked as rows
+def evaluate_legs(arrays, S, today=None):
+    with stage("payoff"):
+        S = np.asarray(S, dtype=float)
+        opt, lin, lp = arrays["option"], arrays["linear"], arrays["lp"]
+        current = revalue_legs(arrays, S[None, :], today, greeks=True)
+
+        qty, premium = opt["qty"][:, None], opt["premium"][:, None]
+        option_expiry = qty * (intrinsic_value(S[None, :], opt["strike"][:, None], opt["is_call"][:, None]) - premium)
+        linear_expiry, _ = linear_pnl(lin["kind"][:, None], lin["entry"][:, None], lin["qty"][:, None],
+                                      lin["liquidation"][:, None], lin["margin"][:, None], S[None, :], 0.0, r)
+        lp_pnl = current["pnl"][len(opt["pos"]) + len(lin["pos"]):]
+
+        return {
+            "pos": np.concatenate([opt["pos"], lin["pos"], lp["pos"]]),
+            "expiry_pnl": np.vstack([option_expiry, linear_expiry, lp_pnl]),
+            "current_pnl": current["pnl"],
+            "delta": current["delta"],
+            "gamma": current["gamma"],
+        }
+
+
+# Net and per-position PnL / delta / gamma of the whole book on the price grid S
+def evaluate_book(arrays, S, today=None):
+    legs = evaluate_legs(arrays, S, today)
+    n_positions = len(arrays["positions"])
+
+    with stage("aggregate"):
+        result = {"S": np.asarray(S, dtype=float), "positions": arrays["positions"]}
+        for key in ("expiry_pnl", "current_pnl", "delta", "gamma"):
+            result[key] = legs[key].sum(axis=0)
+            per_position = np.zeros((n_positions, legs[key].shape[1]))
+            np.add.at(per_position, legs["pos"], legs[key])
+            result["position_" + key] = per_position
+        return result
+
+
+# Prices where a PnL curve crosses zero, linearly interpolated between grid points
+def breakevens(S, pnl):
+    with stage("stats"):
+        S, pnl = np.asarray(S, dtype=float), np.asarray(pnl, dtype=float)
+        crossing = np.nonzero(np.signbit(pnl[:-1]) != np.signbit(pnl[1:]))[0]
+        x0, x1, y0, y1 = S[crossing], S[crossing + 1], pnl[crossing], pnl[crossing + 1]
+        return x0 - y0 * (x1 - x0) / (y1 - y0)
+
+
+if __name__ == "__main__":
+    enable_from_argv()  # --profile / --profile=<trace.json> records stage timings
+    with stage("import"):
+        import matplotlib.pyplot as plt
+
+    # Define the hedged book: univ3.py LP position, put.py long put and shorteth.py short ETH
+    lower_range = 1700
+    upper_range = 3500
+    current_price = 2336
+    S = np.linspace(lower_range, upper_range, 400)  # Range of stock prices
+
+    book = new_book()
+    add_lp(book, 10000, current_price, 2150, 2600, position="LP")
+    add_option(book, "put", 2300, "03/26/2027", 0.571, 68.74, 1.2, position="Put hedge")
+    add_linear(book, current_price, -1.5, position="Short ETH")
+
+    result = evaluate_book(compile_book(book), S)
+
+    # Plotting the net PnL, delta and gamma
+    with stage("render"):
+        fig, (ax, ax_delta, ax_gamma) = plt.subplots(3, 1, figsize=(14, 10), sharex=True,
+                                                     gridspec_kw={"height_ratios": [3, 1, 1]})
+        ax.plot(S, result["expiry_pnl"], label='Net Payoff at Expiration', color='black')
+        ax.plot(S, result["current_pnl"], label='Net Current Payoff', linestyle='dotted', color='purple')
+        for name, pnl in zip(result["positions"], result["position_current_pnl"]):
+            ax.plot(S, pnl, label=f'{name} (current)', alpha=0.5)
+        ax.set_ylabel("Profit / Loss")
+        ax.axhline(0, color='black', lw=0.5)
+        ax.axvline(current_price, color='r', linestyle='--', label=f"Current Price = {current_price}")
+        for breakeven_price in breakevens(S, result["current_pnl"]):
+            ax.axvline(breakeven_price, color='green', linestyle='--', label=f"Breakeven = {breakeven_price:.2f}")
+        ax.legend(fontsize=9)
+        ax.grid(True)
+        ax_delta.plot(S, result["delta"], color='blue')
+        ax_delta.set_ylabel("Net Delta")
+        ax_delta.axhline(0, color='black', lw=0.5)
+        ax_delta.grid(True)
+        ax_gamma.plot(S, result["gamma"], color='orange')
+        ax_gamma.set_ylabel("Net Gamma")
+        ax_gamma.set_xlabel("Stock Price")
+        ax_gamma.grid(True)
+    plt.show()
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from book import DATE_FORMAT
+
+# Columnar option-chain store. Each column is a .npy file opened memory-mapped, rows sorted by
+# (underlying, expiry, call/put, strike). A combined int64 "index" column encodes that order, so a
+# quote is found with one np.searchsorted over the store (O(log n) per lookup, vectorized over many legs).
+
+COLUMNS = ("underlying", "expiry", "is_call", "strike", "bid", "ask", "mark", "iv", "index")
+PRICE_COLUMNS = ("bid", "ask", "mark", "iv")
+MONTHS = {m: i + 1 for i, m in enumerate(["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT",
+                                         "NOV", "DEC"])}
+
+
+# Parse an expiry given as "%m/%d/%Y" (scripts), ISO "YYYY-MM-DD" or exchange style "27DEC24"
+def parse_date(value):
+    value = str(value).strip()
+    if "/" in value:
+        return np.datetime64(datetime.strptime(value, DATE_FORMAT), "D")
+    if "-" in value:
+        return np.datetime64(value[:10], "D")
+    day, month, year = value[:-5], value[-5:-2], value[-2:]
+    return np.datetime64(f"20{year}-{MONTHS[month.upper()]:02d}-{int(day):02d}", "D")
+
+
+# Split an exchange instrument name like ETH-27DEC24-3000-C into its fields
+def parse_instrument_name(name):
+    underlying, expiry, strike, kind = name.split("-")
+    return underlying, expiry, float(strike), kind.upper().startswith("C")
+
+
+# Read a CSV or JSON exchange export into a list of row dicts with the store's fields.
+# Rows either have an instrument_name or underlying / expiry / strike / type columns.
+def read_export(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+        rows = rows.get("result", rows.get("quotes", rows)) if isinstance(rows, dict) else rows
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    records = []
+    for row in rows:
+        if row.get("instrument_name"):
+            underlying, expiry, strike, is_call = parse_instrument_name(row["instrument_name"])
+        else:
+            underlying, expiry, strike = row["underlying"], row["expiry"], float(row["strike"])
+            is_call = str(row.get("type", row.get("kind", "call"))).lower() in ("call", "c")
+        records.append({
+            "underlying": underlying,
+            "expiry": parse_date(expiry),
+            "is_call": is_call,
+            "strike": strike,
+            "bid": _float(row.get("bid", row.get("best_bid_price"))),
+            "ask": _float(row.get("ask", row.get("best_ask_price"))),
+            "mark": _float(row.get("mark", row.get("mark_price"))),
+            "iv": _float(row.get("iv", row.get("mark_iv"))),
+            "underlying_price": _float(row.get("underlying_price")),
+        })
+    return records
+
+
+# Missing quotes become NaN
+def _float(value):
+    return np.nan if value in (None, "") else float(value)
+
+
+# Turn row records into sorted columns plus the underlying vocabulary and strike grid behind the index column
+def build_columns(records, underlyings=None, strikes=None):
+    underlyings = sorted({rec["underlying"] for rec in records}) if underlyings is None else underlyings
+    columns = {
+        "underlying": np.array([underlyings.index(rec["underlying"]) for rec in records], dtype=np.int16),
+        "expiry": np.array([rec["expiry"] for rec in records], dtype="datetime64[D]"),
+        "is_call": np.array([rec["is_call"] for rec in records], dtype=bool),
+        "strike": np.array([rec["strike"] for rec in records], dtype=float),
+    }
+    for name in PRICE_COLUMNS:
+        columns[name] = np.array([rec[name] for rec in records], dtype=float)
+    # Exports quote IV in percent (57.1); the store keeps fractions like the scripts' IV = 0.60
+    quoted_iv = columns["iv"][np.isfinite(columns["iv"])]
+    if len(quoted_iv) and np.median(quoted_iv) > 3:
+        columns["iv"] = columns["iv"] / 100
+    strikes = np.unique(columns["strike"]) if strikes is None else strikes
+    columns["index"] = _index_key(columns["underlying"], columns["expiry"], columns["is_call"],
+                                  np.searchsorted(strikes, columns["strike"]), len(strikes))
+    order = np.argsort(columns["index"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    return columns, underlyings, strikes
+
+
+# One sortable int64 per (underlying, expiry, call/put, strike rank)
+def _index_key(underlying, expiry, is_call, strike_rank, n_strikes):
+    days = expiry.astype("datetime64[D]").astype(np.int64)
+    return ((underlying.astype(np.int64) * 1_000_000 + days) * 2 + is_call) * (n_strikes + 1) + strike_rank
+
+
+# Write an export (or several) into a store directory
+def build_store(paths, directory):
+    paths = [paths] if isinstance(paths, str) else paths
+    records = [rec for path in paths for rec in read_export(path)]
+    columns, underlyings, strikes = build_columns(records)
+    write_store(columns, underlyings, strikes, directory)
+    return open_store(directory)
+
+
+# Save columns as .npy files next to a small JSON with the vocabulary and strike grid
+def write_store(columns, underlyings, strikes, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in COLUMNS:
+        np.save(os.path.join(directory, f"{name}.npy"), columns[name])
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump({"underlyings": underlyings, "strikes": [float(k) for k in strikes]}, f)
+
+
+# Open a store with every column memory-mapped
+def open_store(directory):
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    store = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+    store["underlyings"] = meta["underlyings"]
+    store["strikes"] = np.array(meta["strikes"], dtype=float)
+    return store
+
+
+# Row numbers of many quotes at once (-1 where the chain has no such quote); kind is "call" or "put"
+def lookup(store, underlying, expiry, strike, kind):
+    strike = np.atleast_1d(np.asarray(strike, dtype=float))
+    shape = strike.shape
+    underlying = np.broadcast_to(np.asarray(underlying), shape)
+    expiry = np.broadcast_to(np.asarray(expiry), shape)
+    if expiry.dtype.kind != "M":
+        expiry = np.array([parse_date(e) for e in expiry.ravel()], dtype="datetime64[D]").reshape(shape)
+    is_call = np.broadcast_to(np.asarray(kind) == "call", shape)
+
+    known = {name: i for i, name in enumerate(store["underlyings"])}
+    codes = np.array([known.get(u, -1) for u in underlying.ravel()], dtype=np.int64).reshape(shape)
+    strikes = store["strikes"]
+    rank = np.searchsorted(strikes, strike)
+    strike_known = (rank < len(strikes)) & (strikes[np.minimum(rank, len(strikes) - 1)] == strike)
+    keys = _index_key(codes, expiry, is_call, rank, len(strikes))
+    rows = np.searchsorted(store["index"], keys)
+    found = (codes >= 0) & strike_known & (rows < len(store["index"]))
+    found &= np.asarray(store["index"])[np.minimum(rows, len(store["index"]) - 1)] == keys
+    return np.where(found, rows, -1)
+
+
+# Gather bid / ask / mark / iv for the given rows (NaN where the row is -1)
+def quotes(store, rows, fields=PRICE_COLUMNS):
+    rows = np.asarray(rows)
+    safe = np.maximum(rows, 0)
+    return {name: np.where(rows >= 0, store[name][safe], np.nan) for name in fields}
+
+
+# Contiguous (zero-copy) slice of the store for one underlying / expiry / call or put, strikes ascending
+def chain_slice(store, underlying, expiry, kind):
+    code = store["underlyings"].index(underlying)
+    expiry = parse_date(expiry) if not isinstance(expiry, np.datetime64) else expiry
+    is_call = kind == "call"
+    n = len(store["strikes"]) + 1
+    first = _index_key(np.int64(code), expiry, is_call, 0, len(store["strikes"]))
+    start, stop = np.searchsorted(store["index"], [first, first + n])
+    return {name: store[name][start:stop] for name in ("strike",) + PRICE_COLUMNS}
+
+
+# Fill premium and / or iv of book option legs left as None from the chain.
+# price_field "side" pays the ask on long legs and receives the bid on short legs.
+def fill_book_from_chain(book, store, price_field="mark"):
+    legs = [leg for leg in book["option"] if leg["premium"] is None or leg["iv"] is None]
+    if not legs:
+        return book
+    rows = lookup(store, [leg["underlying"] for leg in legs], [leg["expiration_date"] for leg in legs],
+                  [leg["strike"] for leg in legs], [leg["kind"] for leg in legs])
+    if (rows < 0).any():
+        missing = [f"{leg['underlying']} {leg['expiration_date']} {leg['strike']} {leg['kind']}"
+                   for leg, row in zip(legs, rows) if row < 0]
+        raise KeyError(f"No chain quote for: {', '.join(missing)}")
+    q = quotes(store, rows)
+    for i, leg in enumerate(legs):
+        if leg["premium"] is None:
+            field = ("ask" if leg["num_contracts"] > 0 else "bid") if price_field == "side" else price_field
+            leg["premium"] = float(q[field][i])
+        if leg["iv"] is None:
+            leg["iv"] = float(q["iv"][i])
+    return book
+
+
+if __name__ == "__main__":
+    import sys
+
+    from book import new_book, add_option
+
+    # Build a store from exchange exports and price an iron condor straight from it
+    store_directory = "chain_store"
+    store = build_store(sys.argv[1:], store_directory) if len(sys.argv) > 1 else open_store(store_directory)
+    expiration_date = "08/30/2024"
+
+    book = new_book()
+    add_option(book, "put", 2600, expiration_date, None, None, 30)
+    add_option(book, "put", 2800, expiration_date, None, None, -30)
+    add_option(book, "call", 3400, expiration_date, None, None, -30)
+    add_option(book, "call", 3600, expiration_date, None, None, 30)
+    fill_book_from_chain(book, store, price_field="side")
+    for leg in book["option"]:
+        print(f"{leg['kind']:>4} {leg['strike']:>8} {leg['num_contracts']:>5} premium={leg['premium']:.2f} iv={leg['iv']:.3f}")
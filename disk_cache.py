@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from book import book_from_spec, breakevens, compile_book, evaluate_book
+from instrument import enable_from_argv, stage
+
+# Content-addressed result cache on disk. The key is the sha256 of the normalized position spec plus
+# market inputs; each entry is a directory of .npy arrays (opened memory-mapped), meta.json and an
+# optional chart.png. Entries are evicted least recently used first once the cache grows past max_bytes.
+# Layout: <root>/<key[:2]>/<key>/{<name>.npy, meta.json, chart.png}
+
+KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+# Canonical JSON of a spec and market inputs: sorted keys, numpy values as plain numbers and lists
+def normalize(value):
+    if isinstance(value, dict):
+        return {str(key): normalize(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return normalize(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# sha256 key of a spec and its market inputs
+def cache_key(spec, market):
+    text = json.dumps({"spec": normalize(spec), "market": normalize(market)}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# Open (or create) a cache directory, indexing the existing entries by size and last use.
+# Only key-named directories are entries: staging directories left by a crashed store() are skipped.
+def open_cache(root, max_bytes=512 * 2**20):
+    os.makedirs(root, exist_ok=True)
+    index = {}
+    for prefix in os.scandir(root):
+        if not prefix.is_dir():
+            continue
+        for entry in os.scandir(prefix.path):
+            if not KEY.match(entry.name) or entry.name[:2] != prefix.name:
+                continue
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, "meta.json")):
+                index[entry.name] = (_entry_size(entry.path), entry.stat().st_mtime)
+    return {"root": root, "max_bytes": max_bytes, "index": index,
+            "stats": {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "evicted_bytes": 0}}
+
+
+# Total size of the files in one entry
+def _entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+# Directory of an entry
+def _entry_path(cache, key):
+    return os.path.join(cache["root"], key[:2], key)
+
+
+# Cached arrays (memory-mapped), meta and chart path for key, or None on a miss
+def lookup(cache, key):
+    path = _entry_path(cache, key)
+    if key not in cache["index"]:
+        cache["stats"]["misses"] += 1
+        return None
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in meta["arrays"]}
+    chart = os.path.join(path, "chart.png")
+    # Touch the entry so its modification time records the last use for LRU eviction
+    os.utime(path)
+    cache["index"][key] = (cache["index"][key][0], os.stat(path).st_mtime)
+    cache["stats"]["hits"] += 1
+    return {"arrays": arrays, "meta": meta["meta"], "chart": chart if os.path.exists(chart) else None}
+
+
+# Store arrays, JSON-able meta and optional PNG bytes under key, then evict down to max_bytes
+def store(cache, key, arrays, meta=None, chart=None):
+    path = _entry_path(cache, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Build the entry in a temporary directory and rename it into place, so readers never see half an entry
+    with stage("export"):
+        staging = tempfile.mkdtemp(dir=os.path.dirname(path))
+        for name, values in arrays.items():
+            np.save(os.path.join(staging, name + ".npy"), np.asarray(values))
+        if chart is not None:
+            with open(os.path.join(staging, "chart.png"), "wb") as f:
+                f.write(chart)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({"arrays": list(arrays), "meta": normalize(meta or {})}, f)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(staging, path)
+    cache["index"][key] = (_entry_size(path), os.stat(path).st_mtime)
+    cache["stats"]["stores"] += 1
+    evict(cache, keep=key)
+    return path
+
+
+# Drop least recently used entries until the cache fits in max_bytes (never the entry just stored)
+def evict(cache, keep=None):
+    total = sum(size for size, _ in cache["index"].values())
+    for key in sorted(cache["index"], key=lambda key: cache["index"][key][1]):
+        if total <= cache["max_bytes"]:
+            break
+        if key == keep:
+            continue
+        size, _ = cache["index"].pop(key)
+        shutil.rmtree(_entry_path(cache, key), ignore_errors=True)
+        total -= size
+        cache["stats"]["evictions"] += 1
+        cache["stats"]["evicted_bytes"] += size
+    return cache
+
+
+# Render the payoff chart of an evaluated book to PNG bytes on its own Agg canvas, leaving the process backend alone
+def _render(result, spot):
+    import io
+
+    with stage("import"):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+    with stage("render"):
+        fig = Figure(figsize=(14, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.plot(result["S"], result["expiry_pnl"], label='Net Payoff at Expiration', color='black')
+        ax.plot(result["S"], result["current_pnl"], label='Net Current Payoff', linestyle='dotted', color='purple')
+        ax.axvline(spot, color='r', linestyle='--', label=f"Current Price = {spot}")
+        ax.axhline(0, color='black', lw=0.5)
+        ax.set_xlabel("Stock Price")
+        ax.set_ylabel("Profit / Loss")
+        ax.legend(fontsize=9)
+        ax.grid(True)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+
+
+# Evaluate a book spec on S through the cache; today counts in whole days, the way years_to_expiry does
+def cached_evaluate(cache, spec, S, spot, today=None, render=False):
+    today = datetime.today() if today is None else today
+    S = np.asarray(S, dtype=float)
+    # The whole grid is hashed, so grids sharing endpoints and length (but not spacing) get different keys
+    grid = hashlib.sha256(np.ascontiguousarray(S, dtype=float).tobytes()).hexdigest()
+    market = {"S": grid, "spot": spot, "today": today.strftime("%Y-%m-%d"), "render": render}
+    key = cache_key(spec, market)
+    hit = lookup(cache, key)
+    if hit is not None:
+        return hit
+
+    result = evaluate_book(compile_book(book_from_spec(spec)), S, today)
+    arrays = {name: result[name] for name in ("S", "expiry_pnl", "current_pnl", "delta", "gamma",
+                                              "position_expiry_pnl", "position_current_pnl")}
+    meta = {"positions": result["positions"], "max_profit": float(result["expiry_pnl"].max()),
+            "max_loss": float(result["expiry_pnl"].min()),
+            "current_pnl_at_spot": float(np.interp(spot, S, result["current_pnl"])),
+            "breakevens": breakevens(S, result["expiry_pnl"]).tolist()}
+    path = store(cache, key, arrays, meta, _render(result, spot) if render else None)
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in arrays}
+    chart = os.path.join(path, "chart.png")
+    # The same JSON-normalized meta a later hit reads back from meta.json
+    return {"arrays": arrays, "meta": normalize(meta), "chart": chart if render else None}
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python disk_cache.py [cache dir] [--profile[=trace.json]]: evaluates the same positions twice and reports
+    # hits and evictions
+    enable_from_argv()
+    root = sys.argv[1] if len(sys.argv) > 1 else "result_cache"
+    cache = open_cache(root, max_bytes=2 * 2**20)
+    S = np.linspace(1700, 3500, 400)
+    specs = [{"legs": [
+        {"type": "put", "strike": strike, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 128.85,
+         "num_contracts": -1},
+        {"type": "call", "strike": strike, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 142.11,
+         "num_contracts": -1}]} for strike in range(2400, 2800, 50)]
+
+    for run in ("cold", "warm"):
+        start = time.perf_counter()
+        for spec in specs:
+            cached_evaluate(cache, spec, S, 2620, render=True)
+        print(f"{run}: {(time.perf_counter() - start) * 1000:.1f} ms, {cache['stats']}")
@@ -0,0 +1,187 @@
+from datetime import datetime
+
+import numpy as np
+
+from book import book_from_spec, breakevens, compile_book, evaluate_legs
+from instrument import enable_from_argv, stage
+
+# A small evaluation graph with cached nodes. Inputs carry a version that only moves when the value
+# changes; a node is recomputed when the versions of its dependencies differ from the ones it was
+# last computed with, otherwise its cached value is a hit. A recomputed node only gets a new version
+# when its value changed, so changing one leg's IV re-runs that leg's current value, the current payoff
+# and what reads it, while the grid, every expiry payoff and the other legs stay cached.
+
+
+# Create an empty graph
+def new_graph():
+    return {"inputs": {}, "nodes": {}, "cache": {}, "versions": {}, "stats": {"hits": 0, "misses": 0, "nodes": {}}}
+
+
+# Set an input value; its version (and so every dependent node) only changes if the value did
+def set_input(graph, name, value):
+    if name in graph["inputs"] and _same(graph["inputs"][name], value):
+        return graph
+    graph["inputs"][name] = value
+    graph["versions"][name] = graph["versions"].get(name, 0) + 1
+    return graph
+
+
+# Values compared for changes: arrays element-wise, dicts field by field, everything else with ==
+def _same(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.shape(a) == np.shape(b) and np.array_equal(a, b)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key]) for key in a)
+    return type(a) is type(b) and a == b
+
+
+# Register a node: func(*dependency values) computes it; deps are input or node names
+def add_node(graph, name, func, deps):
+    graph["nodes"][name] = (func, tuple(deps))
+    graph["stats"]["nodes"][name] = {"hits": 0, "misses": 0}
+    return graph
+
+
+# Value of an input or node, recomputing only when a dependency moved since the cached value
+def get(graph, name):
+    if name in graph["inputs"]:
+        return graph["inputs"][name]
+    func, deps = graph["nodes"][name]
+    values = [get(graph, dep) for dep in deps]
+    key = tuple(graph["versions"][dep] for dep in deps)
+    cached = graph["cache"].get(name)
+    counters = graph["stats"]["nodes"][name]
+    if cached is not None and cached[0] == key:
+        graph["stats"]["hits"] += 1
+        counters["hits"] += 1
+        return cached[1]
+    graph["stats"]["misses"] += 1
+    counters["misses"] += 1
+    value = func(*values)
+    # A recomputed value equal to the cached one keeps its version, so dependents stay cached
+    if cached is None or not _same(cached[1], value):
+        graph["versions"][name] = graph["versions"].get(name, 0) + 1
+    graph["cache"][name] = (key, value)
+    return value
+
+
+# Reset the hit / miss counters
+def reset_stats(graph):
+    graph["stats"]["hits"] = graph["stats"]["misses"] = 0
+    for counters in graph["stats"]["nodes"].values():
+        counters["hits"] = counters["misses"] = 0
+    return graph
+
+
+# Expiry PnL of a single spec leg on the grid; option legs get a placeholder iv, which the expiry payoff ignores
+def _leg_expiry(leg, S):
+    leg = dict(leg, iv=1.0) if leg["type"] in ("call", "put") else leg
+    return evaluate_legs(compile_book(book_from_spec({"legs": [leg]})), S)["expiry_pnl"][0]
+
+
+# Current PnL of a single spec leg on the grid
+def _leg_current(leg, S, today):
+    return evaluate_legs(compile_book(book_from_spec({"legs": [leg]})), S, today)["current_pnl"][0]
+
+
+# Summary stats of the payoff curves, as the strategy scripts print them
+def _stats(S, expiry_pnl, current_pnl):
+    return {"max_profit": float(expiry_pnl.max()), "max_loss": float(expiry_pnl.min()),
+            "expiry_breakevens": breakevens(S, expiry_pnl), "current_breakevens": breakevens(S, current_pnl)}
+
+
+# The scripts' table: 18 evenly spaced prices plus strikes and breakevens, both payoffs interpolated
+def _table(lower_range, upper_range, strikes, stats, S, expiry_pnl, current_pnl):
+    with stage("table"):
+        prices = np.linspace(lower_range, upper_range, 18)
+        prices = np.unique(np.concatenate([prices, strikes, stats["expiry_breakevens"]]))
+        return {"prices": prices, "expiry_pnl": np.interp(prices, S, expiry_pnl),
+                "current_pnl": np.interp(prices, S, current_pnl)}
+
+
+# Payoff chart with the table underneath, like the strategy scripts draw it
+def _figure(S, expiry_pnl, current_pnl, spot, table):
+    with stage("import"):
+        import matplotlib.pyplot as plt
+
+    with stage("render"):
+        fig, ax = plt.subplots(figsize=(14, 8))
+        ax.plot(S, expiry_pnl, label='Payoff at Expiration', color='black')
+        ax.plot(S, current_pnl, label='Current Payoff', linestyle='dotted', color='purple')
+        ax.axvline(spot, color='r', linestyle='--', label=f"Current Price = {spot}")
+        ax.axhline(0, color='black', lw=0.5)
+        ax.set_ylabel("Profit / Loss")
+        ax.legend(fontsize=9)
+        ax.grid(True)
+        ax.table(cellText=[np.round(table["expiry_pnl"], 2), np.round(table["current_pnl"], 2)],
+                 rowLabels=["Payoff at Expiration", "Current Payoff"], colLabels=np.round(table["prices"], 2),
+                 cellLoc='center', loc='bottom', bbox=[0, -0.3, 1, 0.2])
+        plt.subplots_adjust(left=0.2, bottom=0.3)
+        return fig
+
+
+# Graph for a book spec: inputs lower_range, upper_range, n_points, today, spot and one "leg.<i>" per leg
+def book_graph(spec, lower_range, upper_range, spot, n_points=400, today=None):
+    graph = new_graph()
+    set_input(graph, "lower_range", lower_range)
+    set_input(graph, "upper_range", upper_range)
+    set_input(graph, "n_points", n_points)
+    set_input(graph, "today", datetime.today() if today is None else today)
+    set_input(graph, "spot", spot)
+    add_node(graph, "grid", lambda lo, hi, n: np.linspace(lo, hi, n), ["lower_range", "upper_range", "n_points"])
+
+    legs = [f"leg.{i}" for i in range(len(spec["legs"]))]
+    for name, leg in zip(legs, spec["legs"]):
+        set_input(graph, name, dict(leg))
+        # Expiry payoffs do not depend on today or IV, so they read the leg without its iv
+        add_node(graph, f"{name}.expiry_fields", lambda leg: {k: v for k, v in leg.items() if k != "iv"}, [name])
+        add_node(graph, f"{name}.expiry", _leg_expiry, [f"{name}.expiry_fields", "grid"])
+        add_node(graph, f"{name}.current", _leg_current, [name, "grid", "today"])
+
+    add_node(graph, "expiry_payoff", lambda *curves: np.sum(curves, axis=0), [f"{leg}.expiry" for leg in legs])
+    add_node(graph, "current_payoff", lambda *curves: np.sum(curves, axis=0), [f"{leg}.current" for leg in legs])
+    add_node(graph, "strikes", lambda *legs: np.array([leg["strike"] for leg in legs if "strike" in leg], dtype=float),
+             legs)
+    add_node(graph, "stats", _stats, ["grid", "expiry_payoff", "current_payoff"])
+    add_node(graph, "table", _table, ["lower_range", "upper_range", "strikes", "stats", "grid", "expiry_payoff",
+                                      "current_payoff"])
+    add_node(graph, "figure", _figure, ["grid", "expiry_payoff", "current_payoff", "spot", "table"])
+    return graph
+
+
+# Change one field of one leg, leaving every other leg's version alone
+def set_leg_field(graph, index, field, value):
+    leg = dict(graph["inputs"][f"leg.{index}"])
+    leg[field] = value
+    return set_input(graph, f"leg.{index}", leg)
+
+
+if __name__ == "__main__":
+    import time
+
+    enable_from_argv()
+
+    # short_straddle.py, then an IV change on the call leg: only that leg's current value and its dependents recompute
+    spec = {"legs": [
+        {"type": "put", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 128.85,
+         "num_contracts": -1},
+        {"type": "call", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 142.11,
+         "num_contracts": -1},
+    ]}
+    graph = book_graph(spec, 1800, 3400, spot=2620)
+
+    for label, change in (("first run", None), ("unchanged", None), ("call IV 0.495 -> 0.55", (1, "iv", 0.55)),
+                          ("spot 2620 -> 2650", None)):
+        if change is not None:
+            set_leg_field(graph, *change)
+        if label.startswith("spot"):
+            set_input(graph, "spot", 2650)
+        reset_stats(graph)
+        start = time.perf_counter()
+        get(graph, "table")
+        stats = get(graph, "stats")
+        elapsed = (time.perf_counter() - start) * 1000
+        recomputed = [name for name, counters in graph["stats"]["nodes"].items() if counters["misses"]]
+        print(f"{label:<24} {elapsed:7.2f} ms  hits={graph['stats']['hits']:<3} misses={graph['stats']['misses']:<3} "
+              f"recomputed={recomputed}")
+    print(f"Max loss {stats['max_loss']:.2f}, current breakevens {np.round(stats['current_breakevens'], 2)}")
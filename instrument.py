@@ -0,0 +1,147 @@
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Stage-level instrumentation: wall time, call counts and peak traced memory per pipeline stage.
+#   with stage("price"):
+#       ...
+# Disabled by default, when stage() hands back one shared no-op context, so the hooks cost a function call.
+# Enable it by setting OPTIONS_PNL_PROFILE (a path for the JSON trace, or 1 for the text summary only),
+# with --profile / --profile=<trace.json> on a command line that calls enable_from_argv, or with enable().
+# The trace uses the Chrome trace event format (open it in chrome://tracing or Perfetto) plus per-stage totals.
+# Stages nest; "self" time excludes the stages run inside.
+
+STAGES = ("import", "parse", "price", "payoff", "aggregate", "stats", "table", "render", "export")
+ENV_VAR = "OPTIONS_PNL_PROFILE"
+
+_NULL = nullcontext()
+_profile = None  # Profiler state while enabled
+
+
+# Context manager timing one stage; a shared no-op when instrumentation is off
+def stage(name):
+    if _profile is None:
+        return _NULL
+    return _timed(name)
+
+
+@contextmanager
+def _timed(name):
+    profile = _profile
+    stack = profile["stack"]
+    memory = profile["memory"]
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # The peak counter is global: fold it into the enclosing stage before resetting it for this one
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+    frame = {"child": 0.0, "peak": 0, "memory_start": current if memory else 0}
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        peak_bytes = 0
+        if memory:
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame["memory_start"]
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        if stack:
+            stack[-1]["child"] += elapsed
+        totals = profile["stages"].setdefault(name, {"calls": 0, "wall": 0.0, "self": 0.0, "peak_bytes": 0})
+        totals["calls"] += 1
+        totals["wall"] += elapsed
+        totals["self"] += elapsed - frame["child"]
+        totals["peak_bytes"] = max(totals["peak_bytes"], peak_bytes)
+        if len(profile["events"]) < profile["max_events"]:
+            profile["events"].append({"name": name, "ph": "X", "pid": os.getpid(), "tid": 0,
+                                      "ts": (start - profile["origin"]) * 1e6, "dur": elapsed * 1e6,
+                                      "args": {"peak_bytes": peak_bytes}})
+
+
+# Turn instrumentation on; the trace is written to trace_path and the summary printed to stderr at exit
+def enable(trace_path=None, memory=True, max_events=100_000, report_at_exit=True):
+    global _profile
+    if _profile is not None:
+        return _profile
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _profile = {"stack": [], "stages": {}, "events": [], "memory": memory, "max_events": max_events,
+                "origin": time.perf_counter(), "trace_path": trace_path}
+    if report_at_exit:
+        atexit.register(_report_at_exit)
+    return _profile
+
+
+# Turn instrumentation off and return what was recorded
+def disable():
+    global _profile
+    profile, _profile = _profile, None
+    if profile is not None and profile["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return profile
+
+
+# True while stages are being recorded
+def enabled():
+    return _profile is not None
+
+
+# Enable from --profile / --profile=<trace.json> in argv (removed from argv so scripts do not see it)
+def enable_from_argv(argv=None):
+    argv = sys.argv if argv is None else argv
+    for i, arg in enumerate(argv):
+        if arg == "--profile" or arg.startswith("--profile="):
+            del argv[i]
+            enable(arg.partition("=")[2] or None)
+            return True
+    return False
+
+
+# Per-stage totals and Chrome trace events of the current (or a finished) profile
+def trace(profile=None):
+    profile = _profile if profile is None else profile
+    stages = {name: dict(totals) for name, totals in profile["stages"].items()}
+    return {"traceEvents": list(profile["events"]), "displayTimeUnit": "ms", "stages": stages}
+
+
+# Write the JSON trace
+def write_trace(path, profile=None):
+    with open(path, "w") as f:
+        json.dump(trace(profile), f)
+    return path
+
+
+# Text summary: one line per stage in pipeline order, then any other stage names
+def summary(profile=None):
+    profile = _profile if profile is None else profile
+    stages = profile["stages"]
+    names = [name for name in STAGES if name in stages] + sorted(set(stages) - set(STAGES))
+    lines = [f"{'stage':<10} {'calls':>8} {'wall ms':>12} {'self ms':>12} {'peak MiB':>10}"]
+    for name in names:
+        totals = stages[name]
+        lines.append(f"{name:<10} {totals['calls']:>8} {totals['wall'] * 1000:>12.3f} {totals['self'] * 1000:>12.3f} "
+                     f"{totals['peak_bytes'] / 2**20:>10.2f}")
+    return "\n".join(lines)
+
+
+# atexit hook: write the trace if a path was given and print the summary
+def _report_at_exit():
+    if _profile is None:
+        return
+    if _profile["trace_path"]:
+        write_trace(_profile["trace_path"])
+    print(summary(), file=sys.stderr)
+
+
+# OPTIONS_PNL_PROFILE=1 prints the summary at exit, any other value is also the trace path
+if os.environ.get(ENV_VAR, "") not in ("", "0"):
+    enable(None if os.environ[ENV_VAR] == "1" else os.environ[ENV_VAR])
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+
+from book import evaluate_legs
+
+# Streaming evaluation of a book on large price grids (1M+ points). The grid is generated block by block,
+# each block goes through evaluate_legs, and the per-position sums are written with out= straight into
+# preallocated outputs, which can be .npy files opened as memory maps. Working memory is about
+# n_legs x block x the few curves evaluate_legs keeps, whatever the grid size; the block shrinks as legs grow.
+# Outputs: S, expiry_pnl, current_pnl, delta, gamma (n_points) and position_<curve> (n_positions x n_points).
+
+CURVES = ("expiry_pnl", "current_pnl", "delta", "gamma")
+MAX_CELLS = 2**18  # Leg x price cells per block
+MIN_BLOCK = 256
+
+
+# Output buffers for a grid, in memory or as .npy memory maps in directory path
+def allocate(n_positions, n_points, path=None):
+    shapes = {"S": (n_points,)} | {key: (n_points,) for key in CURVES} | {
+        "position_" + key: (n_positions, n_points) for key in CURVES}
+    if path is None:
+        return {name: np.empty(shape) for name, shape in shapes.items()}
+    os.makedirs(path, exist_ok=True)
+    return {name: np.lib.format.open_memmap(os.path.join(path, name + ".npy"), mode="w+", dtype=float, shape=shape)
+            for name, shape in shapes.items()}
+
+
+# Open the outputs written to path read-only (memory-mapped)
+def load(path):
+    names = ["S", *CURVES, *("position_" + key for key in CURVES)]
+    return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in names}
+
+
+# Points per block for a book: MAX_CELLS spread over the legs
+def block_size(arrays, max_cells=MAX_CELLS):
+    n_legs = sum(len(arrays[kind]["pos"]) for kind in ("option", "linear", "lp"))
+    return max(MIN_BLOCK, max_cells // max(n_legs, 1))
+
+
+# Evaluate the book on np.linspace(lower_range, upper_range, n_points) in blocks; returns the filled outputs.
+# Pass out (from allocate) to reuse buffers, or path to stream the results into .npy files.
+def evaluate_streamed(arrays, lower_range, upper_range, n_points, today=None, block=None, out=None, path=None):
+    n_positions = len(arrays["positions"])
+    out = allocate(n_positions, n_points, path) if out is None else out
+    block = block_size(arrays) if block is None else block
+
+    # evaluate_legs stacks legs as option, linear, lp; sort them by position once so blocks reduce with reduceat
+    pos = np.concatenate([arrays[kind]["pos"] for kind in ("option", "linear", "lp")])
+    order = np.argsort(pos, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(pos[order]) != 0])
+
+    step = (upper_range - lower_range) / max(n_points - 1, 1)
+    index = np.arange(block, dtype=float)
+    S = np.empty(block)
+    for start in range(0, n_points, block):
+        stop = min(start + block, n_points)
+        n = stop - start
+        # Grid block computed the way np.linspace does: lower + i * step
+        np.add(index[:n], start, out=S[:n])
+        np.multiply(S[:n], step, out=S[:n])
+        np.add(S[:n], lower_range, out=S[:n])
+        if stop == n_points and n_points > 1:
+            S[n - 1] = upper_range
+        out["S"][start:stop] = S[:n]
+
+        # An empty book has no legs to reduce: every curve is 0
+        if not len(order):
+            for key in CURVES:
+                out[key][start:stop] = 0.0
+            continue
+        legs = evaluate_legs(arrays, S[:n], today)
+        for key in CURVES:
+            position_block = out["position_" + key][:, start:stop]
+            np.add.reduceat(legs[key][order], starts, axis=0, out=position_block)
+            np.sum(position_block, axis=0, out=out[key][start:stop])
+
+    for values in out.values():
+        if isinstance(values, np.memmap):
+            values.flush()
+    return out
+
+
+# Max / min of a streamed curve and its zero crossings, read back block by block
+def streamed_stats(S, pnl, block=2**20):
+    high, low, crossings = -np.inf, np.inf, []
+    for start in range(0, len(S), block):
+        stop = min(start + block + 1, len(S))  # One point of overlap, so crossings at block edges are found
+        s, y = np.asarray(S[start:stop]), np.asarray(pnl[start:stop])
+        high, low = max(high, y.max()), min(low, y.min())
+        i = np.flatnonzero(np.signbit(y[:-1]) != np.signbit(y[1:]))
+        crossings.append(s[i] - y[i] * (s[i + 1] - s[i]) / (y[i + 1] - y[i]))
+    return {"max": float(high), "min": float(low), "breakevens": np.concatenate(crossings)}
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+    from datetime import datetime
+
+    from book import book_from_spec, compile_book, evaluate_book
+    from strategies import SCRIPTS
+
+    # python large_grid.py [output dir]: every strategy script as one position of a book, streamed to memory maps
+    # at growing grid sizes; the peak traced memory stays flat
+    today = datetime(2024, 6, 1)
+    book = {"option": [], "linear": [], "lp": []}
+    for name, spec in SCRIPTS.items():
+        for kind, legs in book_from_spec(spec).items():
+            book[kind] += [dict(leg, position=name) for leg in legs]
+    arrays = compile_book(book)
+
+    small = evaluate_streamed(arrays, 1500, 4000, 10_001, today, block=777)
+    reference = evaluate_book(arrays, np.linspace(1500, 4000, 10_001), today)
+    error = max(np.abs(small[key] - reference[key]).max() for key in (*CURVES, *("position_" + k for k in CURVES)))
+    print(f"{len(arrays['positions'])} positions; max difference from evaluate_book on 10,001 points: {error:.2e}")
+
+    # Without an output directory the memory maps go to a temporary directory removed at the end
+    with tempfile.TemporaryDirectory() as scratch:
+        root = sys.argv[1] if len(sys.argv) > 1 else scratch
+        for n_points in (100_000, 500_000, 2_000_000):
+            tracemalloc.start()
+            start = time.perf_counter()
+            out = evaluate_streamed(arrays, 1500, 4000, n_points, today, path=os.path.join(root, str(n_points)))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            stats = streamed_stats(out["S"], out["expiry_pnl"])
+            on_disk = sum(values.nbytes for values in out.values())
+            print(f"{n_points:>9,} points: {elapsed:6.2f} s, peak traced memory {peak / 2**20:6.1f} MiB, "
+                  f"{on_disk / 2**20:8.1f} MiB written, max {stats['max']:.2f}, min {stats['min']:.2f}")
@@ -0,0 +1,176 @@
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# Headless harness for the legacy strategy scripts: each script runs in a worker process with a frozen clock
+# (datetime.today() / now() return FROZEN_TODAY), the Agg backend and plt.show() as a no-op. The arrays it
+# computes (S, payoff_*, current_payoff*, table_*, breakeven*) are captured as golden data.
+#   python legacy_harness.py [out dir] [--today YYYY-MM-DD] [--workers N] [--check]
+# --check also compares the current PnL each script shows (its table, which is scaled by the contract counts,
+# or else its plotted total curve) with book.evaluate_book on the strategies.SCRIPTS spec.
+# Output: <out dir>/<script>.npz per script and <out dir>/index.json with timings, captured names and errors.
+
+FROZEN_TODAY = datetime(2024, 6, 1)  # Before every script's expiry, like bench.BENCH_TODAY
+CAPTURE = re.compile(r"^(S|T|payoff_\w*|\w*_payoff\w*|current_\w+|table_\w+|breakeven\w*|total_payoff\w*)$")
+# Current PnL as the scripts show it: table rows at table_prices first, then full curves on S
+CURRENT_TABLES = ("table_current_payoffs", "table_current_profits")
+CURRENT_CURVES = ("current_total_payoff", "current_total_profit", "current_payoff")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# The legacy scripts, by file name (every strategies.SCRIPTS entry)
+def legacy_scripts():
+    from strategies import SCRIPTS
+
+    return sorted(SCRIPTS)
+
+
+# Captured module variables: numbers and numeric arrays whose names match CAPTURE
+def _capture(namespace):
+    captured = {}
+    for name, value in namespace.items():
+        if not CAPTURE.match(name) or isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float, np.number, np.ndarray)):
+            array = np.asarray(value)
+            if array.dtype.kind in "iuf":
+                captured[name] = array
+    return captured
+
+
+# Run one script in this process with a frozen clock and no GUI; returns its timing and captured arrays
+def run_script(script, today=FROZEN_TODAY):
+    import datetime as datetime_module
+    import runpy
+    import warnings
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    real_datetime = datetime_module.datetime
+
+    class FrozenDatetime(real_datetime):
+        @classmethod
+        def today(cls):
+            return cls(today.year, today.month, today.day, today.hour, today.minute, today.second)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.today() if tz is None else cls.today().replace(tzinfo=tz)
+
+    show = plt.show
+    # Scripts do "from datetime import datetime" when they run, so they pick up the frozen class
+    datetime_module.datetime = FrozenDatetime
+    plt.show = lambda *args, **kwargs: None
+    start = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            namespace = runpy.run_path(os.path.join(HERE, script), run_name="__main__")
+        error = None
+    except Exception as exception:
+        namespace, error = {}, f"{type(exception).__name__}: {exception}"
+    finally:
+        datetime_module.datetime = real_datetime
+        plt.show = show
+        plt.close("all")
+    return {"script": script, "seconds": time.perf_counter() - start, "error": error,
+            "arrays": _capture(namespace)}
+
+
+# Worker initializer: import what every script imports, so the first script on a worker is not charged for it
+def _warm_up():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+    import scipy.stats
+
+
+# Run scripts in parallel worker processes (spawned, so each starts from a clean interpreter)
+def run_all(scripts=None, today=FROZEN_TODAY, workers=None):
+    scripts = legacy_scripts() if scripts is None else scripts
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_up) as pool:
+        return list(pool.map(run_script, scripts, [today] * len(scripts)))
+
+
+# (compared name, largest |shown current PnL - engine current_pnl|) for a script, or None without one to compare
+def check_engine(result, today=FROZEN_TODAY):
+    from book import book_from_spec, compile_book, evaluate_book
+    from strategies import SCRIPTS
+
+    arrays = result["arrays"]
+    if "S" not in arrays or result["script"] not in SCRIPTS:
+        return None
+    engine = evaluate_book(compile_book(book_from_spec(SCRIPTS[result["script"]])), arrays["S"], today)
+    for name in CURRENT_TABLES:
+        if name in arrays and "table_prices" in arrays:
+            shown = np.interp(arrays["table_prices"], arrays["S"], engine["current_pnl"])
+            return name, float(np.max(np.abs(shown - arrays[name])))
+    for name in CURRENT_CURVES:
+        if name in arrays:
+            return name, float(np.max(np.abs(engine["current_pnl"] - arrays[name])))
+    return None
+
+
+# Write one .npz per script plus index.json
+def save_golden(results, out_dir, today=FROZEN_TODAY):
+    os.makedirs(out_dir, exist_ok=True)
+    index = {"today": today.isoformat(), "scripts": {}}
+    for result in results:
+        stem = os.path.splitext(result["script"])[0]
+        if result["arrays"]:
+            np.savez(os.path.join(out_dir, stem + ".npz"), **result["arrays"])
+        index["scripts"][result["script"]] = {"file": stem + ".npz" if result["arrays"] else None,
+                                              "seconds": result["seconds"], "error": result["error"],
+                                              "arrays": sorted(result["arrays"]),
+                                              "engine_check": result.get("engine_check")}
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+# Golden arrays of every script in out_dir: {script: {name: array}}
+def load_golden(out_dir):
+    with open(os.path.join(out_dir, "index.json")) as f:
+        index = json.load(f)
+    golden = {}
+    for script, entry in index["scripts"].items():
+        if entry["file"]:
+            with np.load(os.path.join(out_dir, entry["file"])) as data:
+                golden[script] = {name: data[name] for name in data.files}
+    return golden
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the legacy strategy scripts headlessly and save golden arrays")
+    parser.add_argument("out_dir", nargs="?", default="golden")
+    parser.add_argument("--today", type=datetime.fromisoformat, default=FROZEN_TODAY)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--check", action="store_true", help="compare the shown current PnL with book.evaluate_book")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_all(today=args.today, workers=args.workers)
+    wall = time.perf_counter() - start
+    for result in results:
+        if args.check and result["error"] is None:
+            result["engine_check"] = check_engine(result, args.today)
+    save_golden(results, args.out_dir, args.today)
+
+    for result in sorted(results, key=lambda result: -result["seconds"]):
+        status = result["error"] or f"{len(result['arrays'])} arrays"
+        check = result.get("engine_check")
+        check = f"  engine max diff {check[1]:.2e} ({check[0]})" if check is not None else ""
+        print(f"{result['script']:<32} {result['seconds'] * 1000:>9.1f} ms  {status}{check}")
+    total = sum(result["seconds"] for result in results)
+    print(f"{len(results)} scripts, {total:.2f} s of script time in {wall:.2f} s wall, "
+          f"{sum(result['error'] is not None for result in results)} errors")
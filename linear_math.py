@@ -0,0 +1,44 @@
+import numpy as np
+
+# Linear derivative legs: spot, dated futures and perpetuals.
+# A levered leg posts margin = |amount| * entry_price / leverage and is liquidated when
+# equity (margin + unrealized PnL) falls to maintenance_margin * |amount| * price.
+# Liquidation prices are mark prices: price grids are the index, so a future is liquidated when its carried mark
+# (index * exp(r * T)) crosses the liquidation price. Spot and perps are marked at the index (no perp basis).
+# Spot legs are never liquidated; their margin is the notional paid, which is also the most a long can lose.
+
+KINDS = ("spot", "future", "perp")
+SPOT, FUTURE, PERP = range(3)
+
+
+# Price at which a levered long (amount > 0) or short (amount < 0) leg is liquidated; spot legs never are
+def liquidation_price(kind, entry_price, amount, leverage, maintenance_margin):
+    kind, entry_price, amount, leverage, maintenance_margin = (
+        np.asarray(x) for x in (kind, entry_price, amount, leverage, maintenance_margin))
+    long_price = entry_price * (1 - 1 / leverage) / (1 - maintenance_margin)
+    short_price = entry_price * (1 + 1 / leverage) / (1 + maintenance_margin)
+    levered = np.where(amount > 0, long_price, short_price)
+    unlevered = np.where(amount > 0, 0.0, np.inf)
+    return np.where(kind == SPOT, unlevered, levered)
+
+
+# Margin posted for the leg (the most a levered leg can lose before liquidation); the notional for spot legs
+def initial_margin(kind, entry_price, amount, leverage):
+    kind = np.asarray(kind)
+    notional = np.abs(amount) * entry_price
+    return np.where(kind == SPOT, notional, notional / leverage)
+
+
+# Mark price of the leg: spot and perps track the index, futures carry exp(r * T) until expiry
+def linear_mark(kind, S, T, r):
+    carry = np.exp(r * np.maximum(T, 0))
+    return np.where(np.asarray(kind) == FUTURE, S * carry, S)
+
+
+# PnL and delta of linear legs on an index price grid, with liquidated legs floored at minus their margin
+def linear_pnl(kind, entry_price, amount, liquidation, margin, S, T, r):
+    mark = linear_mark(kind, S, T, r)
+    liquidated = np.where(amount > 0, mark <= liquidation, mark >= liquidation)
+    pnl = np.where(liquidated, -margin, amount * (mark - entry_price))
+    delta = np.where(liquidated, 0.0, amount * linear_mark(kind, np.ones_like(mark), T, r))  # d mark / d index
+    return pnl, delta
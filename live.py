@@ -0,0 +1,181 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from book import evaluate_legs, leg_years, revalue_kind
+
+# Live PnL for a compiled book driven by a spot / IV feed.
+# The expiry payoff and the linear and LP legs (which do not depend on IV or time) are evaluated once;
+# each tick only reprices the option legs on the grid and interpolates every position at the new spot.
+# Feed messages are {"spot": 2650.1} or {"spot": 2650.1, "iv": 0.62}; an iv moves every option leg's
+# IV by the change from the first iv the feed reported.
+
+
+# Cached state for a book on the price grid S
+def live_state(arrays, S, today=None):
+    S = np.asarray(S, dtype=float)
+    legs = evaluate_legs(arrays, S, today)
+    n_options, n_positions = len(arrays["option"]["qty"]), len(arrays["positions"])
+    static = np.zeros((n_positions, len(S)))
+    np.add.at(static, legs["pos"][n_options:], legs["current_pnl"][n_options:])
+    options = {field: values[:, None] for field, values in arrays["option"].items()}
+    return {"arrays": arrays, "S": S, "expiry_pnl": legs["expiry_pnl"].sum(axis=0), "static_pnl": static,
+            "options": options, "base_iv": None, "spot": None, "latency": []}
+
+
+# Recompute the current-value curves for a tick; returns the net curve and every position's PnL at spot
+def update(state, spot, iv=None, now=None):
+    start = time.perf_counter()
+    opt, S = state["arrays"]["option"], state["S"]
+    if iv is not None and state["base_iv"] is None:
+        state["base_iv"] = iv
+    shift = 0.0 if iv is None else iv - state["base_iv"]
+
+    # Option legs go through the engine's own revaluation, only with the feed's IV shift applied
+    T = leg_years("option", opt, now)[:, None]
+    iv = np.maximum(opt["iv"] + shift, 1e-4)[:, None]
+    pnl = revalue_kind("option", state["options"], S[None, :], T, iv=iv)["pnl"]
+    position_pnl = state["static_pnl"].copy()
+    np.add.at(position_pnl, opt["pos"], pnl)
+
+    # Linear interpolation of every position at the new spot, sharing one grid lookup
+    i = np.clip(np.searchsorted(S, spot), 1, len(S) - 1)
+    weight = (spot - S[i - 1]) / (S[i] - S[i - 1])
+    at_spot = position_pnl[:, i - 1] * (1 - weight) + position_pnl[:, i] * weight
+    state["spot"], state["current_pnl"], state["position_at_spot"] = spot, position_pnl.sum(axis=0), at_spot
+    state["latency"].append(time.perf_counter() - start)
+    return state["current_pnl"], at_spot
+
+
+# Parse one feed line: JSON, or CSV "spot" / "spot,iv" / "timestamp,spot,iv" with a non-numeric timestamp
+def parse_tick(line):
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        return json.loads(line)
+    fields = line.split(",")
+    try:
+        float(fields[0])
+    except ValueError:
+        fields = fields[1:]
+    tick = {"spot": float(fields[0])}
+    if len(fields) > 1 and fields[1]:
+        tick["iv"] = float(fields[1])
+    return tick
+
+
+# Stand-in feed: follow a file like tail -f and yield each appended tick
+async def tail_feed(path, poll=0.05, from_start=False):
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, 2)
+        while True:
+            line = f.readline()
+            if not line:
+                await asyncio.sleep(poll)
+                continue
+            tick = parse_tick(line)
+            if tick is not None:
+                yield tick
+
+
+# WebSocket feed of JSON ticks (requires the websockets package)
+async def websocket_feed(url):
+    import websockets
+
+    async with websockets.connect(url) as socket:
+        async for message in socket:
+            tick = parse_tick(message)
+            if tick is not None:
+                yield tick
+
+
+# Chart the book and redraw the current curve, spot marker and labels with blitting on every tick
+async def run_dashboard(state, feed, max_ticks=None):
+    import matplotlib.pyplot as plt
+
+    S = state["S"]
+    fig, ax = plt.subplots(figsize=(14, 8))
+    ax.plot(S, state["expiry_pnl"], label='Net Payoff at Expiration', color='black')
+    current_line, = ax.plot(S, state["expiry_pnl"], label='Net Current Payoff', linestyle='dotted', color='purple',
+                            animated=True)
+    marker, = ax.plot([], [], 'o', color='r', animated=True)
+    label = ax.text(0.01, 0.97, "", transform=ax.transAxes, va="top", family="monospace", animated=True)
+    ax.set_xlabel("Stock Price")
+    ax.set_ylabel("Profit / Loss")
+    ax.axhline(0, color='black', lw=0.5)
+    ax.legend(fontsize=9, loc="lower right")
+    ax.grid(True)
+    plt.show(block=False)
+    plt.pause(0.1)
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+
+    ticks = 0
+    async for tick in feed:
+        current, at_spot = update(state, tick["spot"], tick.get("iv"))
+        current_line.set_ydata(current)
+        marker.set_data([tick["spot"]], [at_spot.sum()])
+        worst = np.argmin(at_spot)
+        label.set_text(f"spot {tick['spot']:.2f}  book {at_spot.sum():+.2f}  "
+                       f"worst {state['arrays']['positions'][worst]} {at_spot[worst]:+.2f}")
+        fig.canvas.restore_region(background)
+        for artist in (current_line, marker, label):
+            ax.draw_artist(artist)
+        fig.canvas.blit(fig.bbox)
+        fig.canvas.flush_events()
+        ticks += 1
+        if max_ticks is not None and ticks >= max_ticks:
+            break
+    plt.close(fig)
+
+
+# Write a random walk of ticks to path, standing in for an exchange feed
+async def demo_writer(path, spot, n_ticks, interval=0.05, seed=None):
+    rng = np.random.default_rng(seed)
+    iv = 0.6
+    for _ in range(n_ticks):
+        spot *= np.exp(rng.normal(0, 0.002))
+        iv = max(iv + rng.normal(0, 0.002), 0.05)
+        with open(path, "a") as f:
+            f.write(f"{datetime.now().isoformat()},{spot:.2f},{iv:.4f}\n")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    from book import add_option, add_lp, compile_book, new_book
+
+    # python live.py [feed file]; without one a random walk is written to a temp file and tailed
+    current_price = 2620
+    rng = np.random.default_rng(11)
+    book = new_book()
+    for i in range(50):  # 50 positions: straddles, ratio spreads and LPs
+        strike = round(current_price * rng.uniform(0.85, 1.15), -1)
+        if i % 5 == 4:
+            add_lp(book, 10000, current_price, strike * 0.9, strike * 1.1, position=f"LP {i}")
+        else:
+            add_option(book, "put", strike, "03/26/2027", 0.6, 120, -1, position=f"Position {i}")
+            add_option(book, "call", strike, "03/26/2027", 0.6, 130, -1, position=f"Position {i}")
+            add_option(book, "call", strike + 300, "03/26/2027", 0.6, 60, 2, position=f"Position {i}")
+    state = live_state(compile_book(book), np.linspace(1700, 3500, 400))
+
+    async def main():
+        if len(sys.argv) > 1:
+            await run_dashboard(state, tail_feed(sys.argv[1]))
+            return
+        path = os.path.join(tempfile.mkdtemp(), "ticks.csv")
+        open(path, "w").close()
+        writer = asyncio.create_task(demo_writer(path, current_price, 200, seed=12))
+        await run_dashboard(state, tail_feed(path, from_start=True), max_ticks=200)
+        await writer
+
+    asyncio.run(main())
+    latency = np.array(state["latency"]) * 1000
+    print(f"{len(latency)} ticks, recompute median {np.median(latency):.2f} ms, max {latency.max():.2f} ms")
@@ -0,0 +1,77 @@
+import numpy as np
+
+from book import r, parse_expiry, years_to_expiry
+from lp_math import lp_liquidity, lp_value, lp_delta, lp_gamma
+from pricing import black_scholes_greeks
+
+
+# Value, delta and gamma of many LP positions (rows) at many prices (columns)
+def lp_greeks(L, lower_bound, upper_bound, prices):
+    L, lower_bound, upper_bound = (np.asarray(x, dtype=float)[:, None] for x in (L, lower_bound, upper_bound))
+    prices = np.asarray(prices, dtype=float)
+    prices = prices[None, :] if prices.ndim == 1 else prices
+    return (lp_value(L, lower_bound, upper_bound, prices),
+            lp_delta(L, lower_bound, upper_bound, prices),
+            lp_gamma(L, lower_bound, upper_bound, prices))
+
+
+# Option and perp quantities that bring position delta and gamma to zero.
+# The option neutralizes gamma, the perp (gamma 0) then takes out the remaining delta.
+def hedge_ratios(position_delta, position_gamma, option_delta, option_gamma, perp_delta=1.0):
+    position_delta, position_gamma = np.asarray(position_delta, dtype=float), np.asarray(position_gamma, dtype=float)
+    option_delta, option_gamma = np.asarray(option_delta, dtype=float), np.asarray(option_gamma, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        num_option_contracts = np.where(option_gamma != 0, -position_gamma / option_gamma, 0.0)
+    num_perp = -(position_delta + num_option_contracts * option_delta) / perp_delta
+    return num_option_contracts, num_perp
+
+
+# Hedge every LP position at its current price with one option (kind / strike / expiry / iv per position) plus a perp
+def hedge_lp_positions(initial_investment, entry_price, lower_bound, upper_bound, current_price,
+                       option_kind, option_strike, option_expiration_date, option_iv, today=None):
+    initial_investment, entry_price, lower_bound, upper_bound, current_price = (
+        np.atleast_1d(np.asarray(x, dtype=float))
+        for x in (initial_investment, entry_price, lower_bound, upper_bound, current_price))
+    L = lp_liquidity(initial_investment, entry_price, lower_bound, upper_bound)
+    position_delta = lp_delta(L, lower_bound, upper_bound, current_price)
+    position_gamma = lp_gamma(L, lower_bound, upper_bound, current_price)
+
+    # Any per-position input (a list of strikes, expiries or kinds) sets the number of positions
+    shape = np.broadcast_shapes(*(np.shape(x) for x in (
+        L, current_price, option_kind, option_strike, option_expiration_date, option_iv)))
+    expiry = parse_expiry(np.broadcast_to(np.asarray(option_expiration_date), shape))
+    T = years_to_expiry(expiry, today)
+    is_call = np.broadcast_to(np.asarray(option_kind) == "call", shape)
+    _, option_delta, option_gamma, _ = black_scholes_greeks(current_price, option_strike, T, r, option_iv, is_call)
+
+    num_option_contracts, num_perp = hedge_ratios(position_delta, position_gamma, option_delta, option_gamma)
+    return {
+        "L": L,
+        "position_delta": position_delta,
+        "position_gamma": position_gamma,
+        "option_delta": option_delta,
+        "option_gamma": option_gamma,
+        "num_option_contracts": num_option_contracts,
+        "num_perp": num_perp,
+    }
+
+
+if __name__ == "__main__":
+    # Define the LP positions to hedge (one row per position)
+    initial_investment = [10000, 25000, 5000]
+    entry_price = [2336, 2500, 2400]
+    lower_bound = [2150, 2200, 2000]
+    upper_bound = [2600, 2900, 2700]
+    current_price = 2450
+    hedge_kind = "put"  # LP gamma is negative, so the hedge buys options
+    hedge_strike = 2400
+    hedge_expiration_date = "03/26/2027"
+    hedge_iv = 0.60
+
+    hedge = hedge_lp_positions(initial_investment, entry_price, lower_bound, upper_bound, current_price,
+                               hedge_kind, hedge_strike, hedge_expiration_date, hedge_iv)
+
+    print(f"{'Position':>8} {'Delta':>10} {'Gamma':>12} {'Options':>10} {'Perp':>10}")
+    for i in range(len(initial_investment)):
+        print(f"{i:>8} {hedge['position_delta'][i]:>10.4f} {hedge['position_gamma'][i]:>12.6f} "
+              f"{hedge['num_option_contracts'][i]:>10.4f} {hedge['num_perp'][i]:>10.4f}")
@@ -0,0 +1,59 @@
+import numpy as np
+
+# Closed-form Uniswap v3 position math, vectorized over positions and prices.
+# Uses the same conventions as univ3.py: prices are USDC per WETH and L is in
+# the units returned by get_L, so x = L / sqrt(P) - L / sqrt(upper_bound).
+
+
+# Initial WETH / USDC split of initial_investment deposited at current_price (univ3.py formulas)
+def lp_amounts(initial_investment, current_price, lower_bound, upper_bound, USDC_price=1):
+    sqrt_p, sqrt_a, sqrt_b = np.sqrt(current_price), np.sqrt(lower_bound), np.sqrt(upper_bound)
+    pricing_formula = (sqrt_p - sqrt_a) / ((1 / sqrt_p) - (1 / sqrt_b))
+    amount_WETH = initial_investment / (current_price + pricing_formula * USDC_price)
+    amount_USDC = amount_WETH * pricing_formula
+    return amount_WETH, amount_USDC
+
+
+# Liquidity of the position, same branches as univ3.get_L
+def lp_liquidity(initial_investment, current_price, lower_bound, upper_bound, USDC_price=1):
+    amount_WETH, amount_USDC = lp_amounts(initial_investment, current_price, lower_bound, upper_bound, USDC_price)
+    sqrt_p, sqrt_a, sqrt_b = np.sqrt(current_price), np.sqrt(lower_bound), np.sqrt(upper_bound)
+    below = (amount_WETH * sqrt_a * sqrt_b) / (sqrt_b - sqrt_a)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        in_range = np.minimum(amount_WETH * (sqrt_b * sqrt_p) / (sqrt_b - sqrt_p),
+                              amount_USDC / (sqrt_p - sqrt_a))
+    above = amount_WETH / (sqrt_b - sqrt_a)
+    return np.where(current_price <= lower_bound, below,
+                    np.where(current_price <= upper_bound, in_range, above))
+
+
+# WETH held by the position at price S (also its delta in USDC per USDC of price move)
+def lp_weth_amount(L, lower_bound, upper_bound, S):
+    S = np.asarray(S, dtype=float)
+    clipped = np.clip(S, lower_bound, upper_bound)
+    return L / np.sqrt(clipped) - L / np.sqrt(upper_bound)
+
+
+# USDC held by the position at price S
+def lp_usdc_amount(L, lower_bound, upper_bound, S):
+    S = np.asarray(S, dtype=float)
+    clipped = np.clip(S, lower_bound, upper_bound)
+    return L * np.sqrt(clipped) - L * np.sqrt(lower_bound)
+
+
+# Value of the position in USDC at price S
+def lp_value(L, lower_bound, upper_bound, S):
+    S = np.asarray(S, dtype=float)
+    return lp_weth_amount(L, lower_bound, upper_bound, S) * S + lp_usdc_amount(L, lower_bound, upper_bound, S)
+
+
+# dV/dS of the position: the WETH it currently holds
+def lp_delta(L, lower_bound, upper_bound, S):
+    return lp_weth_amount(L, lower_bound, upper_bound, S)
+
+
+# d2V/dS2 of the position: -L / (2 S^1.5) inside the range, zero outside
+def lp_gamma(L, lower_bound, upper_bound, S):
+    S = np.asarray(S, dtype=float)
+    in_range = (S > lower_bound) & (S < upper_bound)
+    return np.where(in_range, -L / (2 * S**1.5), 0.0)
@@ -0,0 +1,100 @@
+import numpy as np
+
+from lp_math import lp_amounts, lp_liquidity, lp_value
+
+
+# Fees accrued by the position after `days` if the price sits at `prices` (zero when out of range).
+# Either a fee APR on the initial investment, or daily pool volume * fee tier * our share of in-range liquidity.
+def lp_fees(days, prices, lower_bound, upper_bound, initial_investment, fee_apr=None,
+            daily_volume=None, fee_tier=0.0005, liquidity_share=None):
+    days = np.asarray(days, dtype=float)[:, None]
+    prices = np.asarray(prices, dtype=float)[None, :]
+    in_range = (prices >= lower_bound) & (prices <= upper_bound)
+    if fee_apr is not None:
+        daily_fees = initial_investment * fee_apr / 365
+    elif daily_volume is not None and liquidity_share is not None:
+        daily_fees = daily_volume * fee_tier * liquidity_share
+    else:
+        raise ValueError("Pass either fee_apr or daily_volume and liquidity_share")
+    return days * daily_fees * in_range
+
+
+# Position value, accrued fees, HODL value, impermanent loss and total PnL over a (days x prices) grid
+def lp_surface(initial_investment, current_price, lower_bound, upper_bound, days, prices, **fee_kwargs):
+    prices = np.asarray(prices, dtype=float)
+    amount_WETH, amount_USDC = lp_amounts(initial_investment, current_price, lower_bound, upper_bound)
+    L = lp_liquidity(initial_investment, current_price, lower_bound, upper_bound)
+
+    position_value = lp_value(L, lower_bound, upper_bound, prices)[None, :]
+    hodl_value = (amount_WETH * prices + amount_USDC)[None, :]
+    fees = lp_fees(days, prices, lower_bound, upper_bound, initial_investment, **fee_kwargs)
+    shape = fees.shape
+    return {
+        "days": np.asarray(days, dtype=float),
+        "prices": prices,
+        "position_value": np.broadcast_to(position_value, shape),
+        "fees": fees,
+        "hodl_value": np.broadcast_to(hodl_value, shape),
+        "impermanent_loss": np.broadcast_to(position_value - hodl_value, shape),
+        "pnl": position_value + fees - initial_investment,
+        "pnl_vs_hodl": position_value + fees - hodl_value,
+    }
+
+
+# Save every surface of the result into one .npz file (and optionally one surface as CSV)
+def export_surface(surface, path, csv_key=None):
+    np.savez(path, **surface)
+    if csv_key is not None:
+        header = "days," + ",".join(f"{p:.2f}" for p in surface["prices"])
+        rows = np.column_stack([surface["days"], surface[csv_key]])
+        np.savetxt(str(path).rsplit(".", 1)[0] + f"_{csv_key}.csv", rows, delimiter=",", header=header,
+                   comments="", fmt="%.4f")
+
+
+# Heatmap of one surface, days on the y axis and prices on the x axis
+def plot_surface(surface, key="pnl", current_price=None, lower_bound=None, upper_bound=None, ax=None):
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        fig, ax = plt.subplots(figsize=(14, 8))
+    values = surface[key]
+    limit = np.nanmax(np.abs(values))
+    mesh = ax.pcolormesh(surface["prices"], surface["days"], values, cmap="RdYlGn", vmin=-limit, vmax=limit,
+                         shading="auto")
+    ax.figure.colorbar(mesh, ax=ax, label=key.replace("_", " ").title())
+    contour = ax.contour(surface["prices"], surface["days"], values, levels=[0], colors='black', linewidths=1)
+    ax.clabel(contour, fmt="Breakeven")
+    if current_price is not None:
+        ax.axvline(current_price, color='red', linestyle='--', label=f"Current Price = {current_price}")
+    if lower_bound is not None:
+        ax.axvline(lower_bound, color='blue', linestyle='--', label=f"Lower Bound = {lower_bound}")
+    if upper_bound is not None:
+        ax.axvline(upper_bound, color='blue', linestyle='--', label=f"Upper Bound = {upper_bound}")
+    ax.set_xlabel("New WETH Price")
+    ax.set_ylabel("Days Held")
+    ax.legend(fontsize=9)
+    return ax
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # Constants (same position as univ3.py)
+    initial_investment = 10000
+    current_price = 2336
+    lower_bound = 2150
+    upper_bound = 2600
+    fee_apr = 0.35  # Assumed fee APR while in range
+    days = np.arange(0, 91)  # Days held
+    prices = np.linspace(lower_bound - 200, upper_bound + 200, 300)
+
+    surface = lp_surface(initial_investment, current_price, lower_bound, upper_bound, days, prices, fee_apr=fee_apr)
+    export_surface(surface, "lp_surface.npz", csv_key="pnl")
+
+    fig, (ax_pnl, ax_vs_hodl) = plt.subplots(1, 2, figsize=(18, 8))
+    plot_surface(surface, "pnl", current_price, lower_bound, upper_bound, ax=ax_pnl)
+    ax_pnl.set_title("Profit / Loss (value + fees - investment)")
+    plot_surface(surface, "pnl_vs_hodl", current_price, lower_bound, upper_bound, ax=ax_vs_hodl)
+    ax_vs_hodl.set_title("Fees - Impermanent Loss (vs HODL)")
+    plt.tight_layout()
+    plt.show()
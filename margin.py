@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import numpy as np
+
+from stress import run_stress, scenario
+
+# Exchange-style portfolio margin: every leg is revalued on a grid of spot and vol shocks
+# (stress.run_stress, so the same Black-Scholes kernel as everything else) and
+#   maintenance margin = worst loss on the grid + a contingency on short option contracts
+#   initial margin     = maintenance margin * IM_MULTIPLIER
+# Positions are margined alone; the book is margined on its netted grid, so it is never above their sum.
+
+SPOT_SHOCKS = np.linspace(-0.16, 0.16, 9)
+VOL_UP = (1.45, 1.30, 1.20, 1.15)  # IV multipliers per tenor bucket (stress.TENOR_EDGES), front to back
+VOL_DOWN = (0.70, 0.80, 0.85, 0.90)
+CONTINGENCY = 0.01  # Of spot, per short option contract
+IM_MULTIPLIER = 1.3
+
+
+# The risk matrix as stress scenarios: every spot shock with vol unchanged, up and down
+def risk_matrix(spot_shocks=SPOT_SHOCKS, vol_up=VOL_UP, vol_down=VOL_DOWN):
+    catalog = {}
+    for shock in spot_shocks:
+        for label, iv in (("vol flat", 1.0), ("vol up", vol_up), ("vol down", vol_down)):
+            catalog[f"spot {shock:+.0%}, {label}"] = scenario(shock, iv, 0)
+    return catalog
+
+
+# Short option contracts per position valued at spot, the base of the contingency add-on
+def _short_option_notional(arrays, spot):
+    opt = arrays["option"]
+    spot_by_code = np.array([spot[name] for name in arrays["underlyings"]], dtype=float)
+    short = np.maximum(-opt["qty"], 0) * spot_by_code[opt["underlying"]]
+    return np.bincount(opt["pos"], short, minlength=len(arrays["positions"]))
+
+
+# Maintenance and initial margin from grid PnL rows (..., n_scenarios) and short option notional
+def _margins(grid_pnl, short_notional):
+    maintenance = np.maximum(-grid_pnl.min(axis=-1), 0) + CONTINGENCY * short_notional
+    return maintenance, maintenance * IM_MULTIPLIER
+
+
+# Margin per position and for the whole book; keeps the book's grid so trades can be checked incrementally
+def portfolio_margin(arrays, spot, today=None, catalog=None):
+    today = datetime.today() if today is None else today
+    catalog = risk_matrix() if catalog is None else catalog
+    result = run_stress(arrays, spot, catalog, today)
+    short_notional = _short_option_notional(arrays, spot)
+    maintenance, initial = _margins(result["position_pnl"], short_notional)
+    book_maintenance, book_initial = _margins(result["pnl"], short_notional.sum())
+    worst = result["scenarios"][int(np.argmin(result["pnl"]))] if len(result["pnl"]) else None
+    return {"positions": arrays["positions"], "maintenance": maintenance, "initial": initial,
+            "book_maintenance": float(book_maintenance), "book_initial": float(book_initial), "worst_scenario": worst,
+            "grid_pnl": result["pnl"], "short_notional": float(short_notional.sum()), "catalog": catalog,
+            "spot": dict(spot), "today": today}
+
+
+# Margin of a proposed trade (a compiled book of its legs) on its own and added to the book, without revaluing the book
+def trade_margin(margin, trade_arrays):
+    result = run_stress(trade_arrays, margin["spot"], margin["catalog"], margin["today"])
+    short_notional = _short_option_notional(trade_arrays, margin["spot"]).sum()
+    standalone_maintenance, standalone_initial = _margins(result["pnl"], short_notional)
+    book_maintenance, book_initial = _margins(margin["grid_pnl"] + result["pnl"], margin["short_notional"] + short_notional)
+    return {"maintenance": float(standalone_maintenance), "initial": float(standalone_initial),
+            "book_maintenance": float(book_maintenance), "book_initial": float(book_initial),
+            "initial_change": float(book_initial - margin["book_initial"])}
+
+
+if __name__ == "__main__":
+    import time
+
+    from book import add_linear, add_option, compile_book, new_book
+
+    # call_ratio_spread.py and `put ratio spread.py` next to a covered short perp
+    current_price = 2620
+    book = new_book()
+    add_option(book, "call", 2650, "03/26/2027", 0.49, 120.41, 1, position="Call ratio spread")
+    add_option(book, "call", 2900, "03/26/2027", 0.49, 58.12, -4, position="Call ratio spread")
+    add_option(book, "put", 2600, "03/26/2027", 0.49, 110.65, 1, position="Put ratio spread")
+    add_option(book, "put", 2300, "03/26/2027", 0.49, 41.07, -3, position="Put ratio spread")
+    add_linear(book, current_price, -1, position="Short perp", kind="perp", leverage=10)
+    arrays = compile_book(book)
+
+    margin = portfolio_margin(arrays, {"ETH": current_price})
+    print(f"{'position':<20} {'maintenance':>12} {'initial':>12}")
+    for name, mm, im in zip(margin["positions"], margin["maintenance"], margin["initial"]):
+        print(f"{name:<20} {mm:>12.2f} {im:>12.2f}")
+    print(f"{'Book':<20} {margin['book_maintenance']:>12.2f} {margin['book_initial']:>12.2f}"
+          f"  (worst: {margin['worst_scenario']})")
+
+    trade = new_book()
+    add_option(trade, "call", 3200, "03/26/2027", 0.49, 22.40, -5, position="Proposed")
+    start = time.perf_counter()
+    check = trade_margin(margin, compile_book(trade))
+    print(f"Proposed trade: IM {check['initial']:.2f} alone, book IM {check['book_initial']:.2f} "
+          f"({check['initial_change']:+.2f}) in {(time.perf_counter() - start) * 1000:.2f} ms")
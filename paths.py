@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from book import r, leg_years, revalue_legs
+from linear_math import PERP, SPOT, linear_mark
+
+
+# Geometric Brownian motion price paths, shape (n_paths, n_steps + 1), first column = S0
+def gbm_paths(S0, sigma, days, n_paths, steps_per_day=1, drift=0.0, seed=None):
+    rng = np.random.default_rng(seed)
+    n_steps = int(days * steps_per_day)
+    dt = 1 / (365 * steps_per_day)
+    log_returns = rng.standard_normal((n_paths, n_steps), dtype=np.float64)
+    log_returns *= sigma * np.sqrt(dt)
+    log_returns += (drift - 0.5 * sigma**2) * dt
+    paths = np.empty((n_paths, n_steps + 1))
+    paths[:, 0] = 0.0
+    np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+    np.exp(paths, out=paths)
+    paths *= S0
+    return paths
+
+
+# Mean-reverting (Ornstein-Uhlenbeck) annualized funding rate paths, shape (n_paths, n_steps)
+def funding_rate_paths(mean_rate, volatility, reversion, n_paths, n_steps, dt, start_rate=None, seed=None):
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((n_paths, n_steps)) * volatility * np.sqrt(dt)
+    rates = np.empty((n_paths, n_steps))
+    rate = np.full(n_paths, mean_rate if start_rate is None else start_rate, dtype=float)
+    decay = np.exp(-reversion * dt)
+    for t in range(n_steps):  # Recurrence over time steps only, every path advances together
+        rates[:, t] = rate
+        rate = mean_rate + (rate - mean_rate) * decay + shocks[:, t]
+    return rates
+
+
+# Final PnL of every linear leg on every path with funding accrual and liquidation.
+# paths: (n_paths, n_steps + 1); funding_rates: scalar, (n_steps,) or (n_paths, n_steps), annualized;
+# defaults to each perp leg's own funding_rate. T is every leg's years to expiry at the first step (0 when undated);
+# futures are marked with the time left at each step. Returns pnl and liquidated flags, both (n_legs, n_paths).
+def simulate_linear_paths(linear, paths, dt, funding_rates=None, T=None):
+    n_legs, n_paths = len(linear["qty"]), paths.shape[0]
+    pnl = np.empty((n_legs, n_paths))
+    liquidated = np.zeros((n_legs, n_paths), dtype=bool)
+    funding_paid = np.zeros((n_legs, n_paths))
+    T = np.zeros(n_legs) if T is None else T
+    elapsed = dt * np.arange(paths.shape[1])
+    for i in range(n_legs):  # Loop over legs only, every path is handled in one array operation
+        qty, entry, kind = linear["qty"][i], linear["entry"][i], linear["kind"][i]
+        mark = linear_mark(kind, paths, T[i] - elapsed, r)
+        cum_funding = np.zeros_like(paths)
+        if kind == PERP:
+            rate = linear["funding_rate"][i] if funding_rates is None else funding_rates
+            # Longs pay funding on notional when the rate is positive, shorts receive it
+            np.cumsum(-qty * paths[:, :-1] * rate * dt, axis=1, out=cum_funding[:, 1:])
+        equity_pnl = qty * (mark - entry) + cum_funding
+        hit = (kind != SPOT) & (equity_pnl + linear["margin"][i] <= linear["maintenance_margin"][i] * abs(qty) * mark)
+        hit_any = hit.any(axis=1)
+        first_hit = np.argmax(hit, axis=1)
+        liquidated[i] = hit_any
+        pnl[i] = np.where(hit_any, -linear["margin"][i], equity_pnl[:, -1])
+        funding_paid[i] = -np.where(hit_any, cum_funding[np.arange(n_paths), first_hit], cum_funding[:, -1])
+    return {"pnl": pnl, "liquidated": liquidated, "funding_paid": funding_paid}
+
+
+# PnL distribution of the whole book (options marked with Black-Scholes, LP, linear legs with funding) at the end of the paths
+def simulate_book_paths(arrays, paths, dt, today=None, funding_rates=None):
+    today = datetime.today() if today is None else today
+    horizon = timedelta(days=(paths.shape[1] - 1) * dt * 365)
+
+    # Options and LP legs are revalued at the path ends; linear legs replay every path for funding and liquidation
+    leg_pnl = revalue_legs(arrays, paths[:, -1], today + horizon)["pnl"]
+    lin = arrays["linear"]
+    linear = simulate_linear_paths(lin, paths, dt, funding_rates, leg_years("linear", lin, today))
+    n_opt = len(arrays["option"]["pos"])
+    leg_pnl[n_opt:n_opt + len(lin["pos"])] = linear["pnl"]
+    return {"pnl": leg_pnl.sum(axis=0), "leg_pnl": leg_pnl, "liquidated": linear["liquidated"],
+            "funding_paid": linear["funding_paid"]}
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    from book import new_book, add_lp, add_option, add_linear, compile_book
+
+    # Define the hedged book and the simulation
+    current_price = 2336
+    IV = 0.60
+    days = 30
+    n_paths = 100_000
+    steps_per_day = 3  # 8 hour funding intervals
+
+    book = new_book()
+    add_lp(book, 10000, current_price, 2150, 2600, position="LP")
+    add_option(book, "put", 2300, "03/26/2027", IV, 68.74, 1.2, position="Put hedge")
+    add_linear(book, current_price, -1.5, position="Short perp", kind="perp", leverage=5, funding_rate=0.10)
+    arrays = compile_book(book)
+
+    paths = gbm_paths(current_price, IV, days, n_paths, steps_per_day, seed=7)
+    dt = 1 / (365 * steps_per_day)
+    funding = funding_rate_paths(0.10, 0.5, 20, n_paths, paths.shape[1] - 1, dt, seed=8)
+    result = simulate_book_paths(arrays, paths, dt, funding_rates=funding)
+
+    print(f"Mean PnL: {result['pnl'].mean():.2f}")
+    print(f"Perp liquidated on {result['liquidated'].mean():.2%} of paths")
+    print(f"Mean funding received: {-result['funding_paid'].mean():.2f}")
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    ax.hist(result["pnl"], bins=200, color='purple', alpha=0.7)
+    ax.axvline(0, color='black', lw=0.5)
+    ax.set_xlabel(f"Book Profit / Loss after {days} days")
+    ax.set_ylabel("Paths")
+    ax.grid(True)
+    plt.show()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from instrument import stage
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+_ndtr = None
+
+
+# scipy.special.ndtr, imported (and recorded as the "import" stage) the first time a live option is priced
+def _load_ndtr():
+    global _ndtr
+    if _ndtr is None:
+        with stage("import"):
+            from scipy.special import ndtr
+        _ndtr = ndtr
+    return _ndtr
+
+
+# Standard normal CDF; runs without live options never import scipy
+def norm_cdf(x):
+    return _load_ndtr()(x)
+
+
+# Standard normal density
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / SQRT_2PI
+
+
+# Black-Scholes price for calls (is_call True) and puts, broadcast over any leg / price shape
+def black_scholes(S, K, T, r, sigma, is_call):
+    S, K, T, sigma = (np.asarray(x, dtype=float) for x in (S, K, T, sigma))
+    live = T > 0
+    # Nothing live (or nothing at all) to price: skip norm_cdf, so scipy is not imported
+    if not live.any() or np.broadcast(S, K, T).size == 0:
+        return np.where(live, 0.0, intrinsic_value(S, K, is_call))
+    T_live = np.where(live, T, 1.0)
+    sqrt_T = np.sqrt(T_live)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T_live) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    # Put values use N(-d) so only one branch per leg is evaluated: sign = +1 for calls, -1 for puts
+    sign = np.where(is_call, 1.0, -1.0)
+    price = sign * (S * norm_cdf(sign * d1) - K * np.exp(-r * T_live) * norm_cdf(sign * d2))
+    return np.where(live, price, intrinsic_value(S, K, is_call))
+
+
+# Black-Scholes price, delta, gamma and vega in one pass; expired legs (T <= 0) fall back to intrinsic value
+def black_scholes_greeks(S, K, T, r, sigma, is_call):
+    S, K, T, sigma, is_call = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+        np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool))
+    live = T > 0
+    intrinsic = np.where(is_call, np.maximum(S - K, 0), np.maximum(K - S, 0))
+    intrinsic_delta = np.where(is_call, (S > K).astype(float), -(S < K).astype(float))
+    # Only expired (or no) legs: intrinsic values without norm_cdf, so scipy is not imported
+    if not live.any():
+        return intrinsic, intrinsic_delta, np.zeros(S.shape), np.zeros(S.shape)
+    T_live = np.where(live, T, 1.0)
+    sqrt_T = np.sqrt(T_live)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T_live) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    discount = K * np.exp(-r * T_live)
+
+    call_price = S * norm_cdf(d1) - discount * norm_cdf(d2)
+    put_price = discount * norm_cdf(-d2) - S * norm_cdf(-d1)
+    price = np.where(is_call, call_price, put_price)
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1)
+    pdf_d1 = norm_pdf(d1)
+    gamma = pdf_d1 / (S * sigma * sqrt_T)
+    vega = S * pdf_d1 * sqrt_T  # Per 1.00 of volatility
+
+    price = np.where(live, price, intrinsic)
+    delta = np.where(live, delta, intrinsic_delta)
+    gamma = np.where(live, gamma, 0.0)
+    vega = np.where(live, vega, 0.0)
+    return price, delta, gamma, vega
+
+
+# Payoff of the option at expiration (intrinsic value)
+def intrinsic_value(S, K, is_call):
+    return np.where(is_call, np.maximum(S - K, 0), np.maximum(K - S, 0))
@@ -0,0 +1,165 @@
+import numpy as np
+from scipy.optimize import nnls
+
+from pricing import intrinsic_value
+
+# Fits contract quantities to a target PnL-at-expiration curve. The basis matrix has one column per
+# tradable side: long call / short call / long put / short put at every chain strike, plus long and
+# short underlying. Long legs pay the ask and short legs receive the bid, so every column already
+# includes its premium and all quantities are non-negative, which makes the fit a plain NNLS.
+
+
+# Expiry PnL of one contract of every tradable side on the price grid S, built once per chain
+def build_basis(chain, S, spot=None):
+    S = np.asarray(S, dtype=float)
+    strikes = chain["strikes"]
+    columns, kinds, sides, premiums, legs_strikes = [], [], [], [], []
+    for kind in ("call", "put"):
+        payoff = intrinsic_value(S[:, None], strikes[None, :], kind == "call")
+        for side, premium in ((1, chain[f"{kind}_ask"]), (-1, chain[f"{kind}_bid"])):
+            usable = np.isfinite(premium) & (premium > 0)
+            columns.append(side * (payoff[:, usable] - premium[usable]))
+            kinds += [kind] * usable.sum()
+            sides += [side] * usable.sum()
+            premiums.append(premium[usable])
+            legs_strikes.append(strikes[usable])
+    if spot is not None:
+        for side in (1, -1):
+            columns.append((side * (S - spot))[:, None])
+            kinds.append("linear")
+            sides.append(side)
+            premiums.append(np.zeros(1))
+            legs_strikes.append(np.array([spot]))
+    matrix = np.hstack(columns)
+    return {"matrix": matrix, "kind": np.array(kinds), "side": np.array(sides, dtype=float),
+            "premium": np.concatenate(premiums), "strike": np.concatenate(legs_strikes), "S": S,
+            "scale": np.linalg.norm(matrix, axis=0) + 1e-12}
+
+
+# Net premium paid for quantities w (negative when the legs collect a credit)
+def net_premium(basis, w):
+    return np.sum(basis["side"] * basis["premium"] * w)
+
+
+# NNLS on a subset of columns, with optional cost penalty row and grid weights
+def _fit(basis, matrix, target, active, row_weights, cost_penalty, max_cost):
+    A = matrix[:, active] * row_weights[:, None]
+    b = target * row_weights
+    if cost_penalty > 0:
+        cost_row = np.sqrt(cost_penalty) * (basis["side"] * basis["premium"])[active]
+        A = np.vstack([A, cost_row])
+        b = np.append(b, np.sqrt(cost_penalty) * max_cost)
+    # Columns are scaled to unit norm so the solver treats wide and narrow payoffs alike
+    scale = basis["scale"][active]
+    w_scaled, _ = nnls(A / scale, b, maxiter=50 * A.shape[1])
+    w = np.zeros(basis["matrix"].shape[1])
+    w[active] = w_scaled / scale
+    return w
+
+
+# Round quantities to lot_size, then nudge each leg by one lot while that lowers the fit error
+def _round_to_lots(matrix, target, w, lot_size, row_weights, passes=3):
+    w = np.round(w / lot_size) * lot_size
+    matrix = matrix * row_weights[:, None]
+    goal = target * row_weights
+    residual = matrix @ w - goal
+    active = np.flatnonzero(w > 0)
+    for _ in range(passes):
+        improved = False
+        for j in active:
+            column = matrix[:, j] * lot_size
+            for step in (1, -1):
+                if w[j] + step * lot_size < 0:
+                    continue
+                trial = residual + step * column
+                if trial @ trial < residual @ residual:
+                    w[j] += step * lot_size
+                    residual = trial
+                    improved = True
+                    break
+        if not improved:
+            break
+    return w
+
+
+# Contract quantities that best match target (PnL at expiration on basis["S"]).
+# max_legs caps the number of legs, lot_size rounds quantities, max_cost caps the net premium paid.
+# With match_level=False only the shape is matched and the curve may sit at any constant offset
+# (the difference shows up in the net premium instead).
+def replicate(basis, target, max_legs=None, lot_size=None, max_cost=None, row_weights=None, match_level=True):
+    original_target = np.asarray(target, dtype=float)
+    row_weights = np.ones_like(original_target) if row_weights is None else np.asarray(row_weights, dtype=float)
+    matrix, target = basis["matrix"], original_target
+    if not match_level:
+        matrix = matrix - matrix.mean(axis=0)
+        target = target - target.mean()
+    n = basis["matrix"].shape[1]
+    active = np.arange(n)
+    cost_penalty = 0.0
+
+    for _ in range(8):
+        w = _fit(basis, matrix, target, active, row_weights, cost_penalty, max_cost)
+        # Backward elimination: drop the smallest contributor and re-solve until the leg cap holds
+        while max_legs is not None and np.count_nonzero(w > 1e-9) > max_legs:
+            contribution = w * basis["scale"]
+            used = np.flatnonzero(w > 1e-9)
+            active = np.setdiff1d(used, used[np.argmin(contribution[used])])
+            w = _fit(basis, matrix, target, active, row_weights, cost_penalty, max_cost)
+        if max_cost is None or net_premium(basis, w) <= max_cost + 1e-9:
+            break
+        # Push the net premium down with a stiffer cost row until it fits the budget
+        cost_penalty = 1.0 if cost_penalty == 0 else cost_penalty * 10
+
+    if lot_size is not None:
+        w = _round_to_lots(matrix, target, w, lot_size, row_weights)
+        # Rounding can push the premium back over budget; trim the most expensive long legs a lot at a time
+        while max_cost is not None and net_premium(basis, w) > max_cost + 1e-9:
+            cost = np.where((w >= lot_size) & (basis["side"] > 0), basis["premium"], -np.inf)
+            if not np.isfinite(cost.max()):
+                break
+            w[np.argmax(cost)] -= lot_size
+    fitted = basis["matrix"] @ w
+    error = fitted - original_target
+    if not match_level:
+        error = error - error.mean()
+    used = np.flatnonzero(w > 1e-9)
+    legs = [{"type": str(basis["kind"][j]), "strike": float(basis["strike"][j]),
+             "num_contracts": float(basis["side"][j] * w[j]), "premium": float(basis["premium"][j])} for j in used]
+    return {"weights": w, "legs": legs, "fitted": fitted, "rmse": float(np.sqrt(np.mean(error**2))),
+            "net_premium": float(net_premium(basis, w))}
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    from pricing import black_scholes
+
+    # Target: the capped upside shape of custom_double_call.py (1 long 2700 call, 4 short 3050 calls)
+    lower_range = 1800
+    upper_range = 3500
+    S = np.linspace(lower_range, upper_range, 400)
+    target = ((np.maximum(S - 2700, 0) - 224.8) * 1 + (41.98 - np.maximum(S - 3050, 0)) * 4)
+
+    # A model chain standing in for an exchange snapshot (use strategy_search.chain_from_store for real quotes)
+    spot, T, IV = 2650, 30 / 365, 0.615
+    strikes = np.arange(2000, 3450, 50.0)
+    call_mid = black_scholes(spot, strikes, T, 0.01, IV, True)
+    put_mid = black_scholes(spot, strikes, T, 0.01, IV, False)
+    chain = {"strikes": strikes, "call_bid": call_mid * 0.98, "call_ask": call_mid * 1.02,
+             "put_bid": put_mid * 0.98, "put_ask": put_mid * 1.02}
+
+    basis = build_basis(chain, S, spot=spot)
+    result = replicate(basis, target, max_legs=4, lot_size=0.25, match_level=False)
+    for leg in result["legs"]:
+        print(f"{leg['type']:>6} {leg['strike']:>8.0f} {leg['num_contracts']:>7.2f} @ {leg['premium']:.2f}")
+    print(f"RMSE {result['rmse']:.2f}, net premium {result['net_premium']:.2f}")
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    ax.plot(S, target, label='Target Payoff at Expiration', color='black')
+    ax.plot(S, result["fitted"], label='Replicated Payoff', linestyle='dotted', color='purple')
+    ax.set_xlabel("Stock Price")
+    ax.set_ylabel("Profit / Loss")
+    ax.axhline(0, color='black', lw=0.5)
+    ax.legend(fontsize=9)
+    ax.grid(True)
+    plt.show()
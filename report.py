@@ -0,0 +1,102 @@
+import csv
+import json
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from graph import book_graph, get
+from instrument import enable_from_argv, stage
+
+# Plotting-free output of a book: the scripts' bottom table, breakevens and stats as text, CSV or JSON.
+#   python report.py <spec.json | script name> [--format text|csv|json] [--lower X] [--upper X] [--points N]
+#                    [--today YYYY-MM-DD] [--spot X] [--output path] [--plot] [--profile[=trace.json]]
+# A script name (short_straddle.py) takes its legs and price range from strategies.SCRIPTS.
+# matplotlib is only imported with --plot, and scipy only when an option leg is still live on --today
+# (expired legs are valued at intrinsic without it).
+
+FORMATS = ("text", "csv", "json")
+
+
+# Spec with lower_range / upper_range from a JSON file or a strategy script name
+def load_spec(source):
+    if source.endswith(".json"):
+        with open(source) as f:
+            return json.load(f)
+    from strategies import SCRIPTS
+
+    name = source if source.endswith(".py") else source + ".py"
+    if name not in SCRIPTS:
+        raise ValueError(f"Unknown strategy script: {source}")
+    return SCRIPTS[name]
+
+
+# Stats and table of a spec on its price grid
+def build_report(spec, lower_range=None, upper_range=None, n_points=400, today=None, spot=None):
+    lower_range = spec.get("lower_range", 1700) if lower_range is None else lower_range
+    upper_range = spec.get("upper_range", 3500) if upper_range is None else upper_range
+    spot = (lower_range + upper_range) / 2 if spot is None else spot
+    graph = book_graph(spec, lower_range, upper_range, spot, n_points, today)
+    return {"graph": graph, "stats": get(graph, "stats"), "table": get(graph, "table")}
+
+
+# JSON-able stats and table
+def report_dict(report):
+    stats, table = report["stats"], report["table"]
+    return {"max_profit": round(stats["max_profit"], 2), "max_loss": round(stats["max_loss"], 2),
+            "expiry_breakevens": np.round(stats["expiry_breakevens"], 2).tolist(),
+            "current_breakevens": np.round(stats["current_breakevens"], 2).tolist(),
+            "table": {name: np.round(values, 2).tolist() for name, values in table.items()}}
+
+
+# Write the report to a file object in one of FORMATS
+def write_report(report, out, fmt="text"):
+    with stage("export"):
+        if fmt == "json":
+            json.dump(report_dict(report), out, indent=1)
+            out.write("\n")
+            return
+        table = report["table"]
+        rows = zip(table["prices"], table["expiry_pnl"], table["current_pnl"])
+        if fmt == "csv":
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(["price", "payoff_at_expiration", "current_payoff"])
+            writer.writerows((f"{price:.2f}", f"{expiry:.2f}", f"{current:.2f}") for price, expiry, current in rows)
+            return
+        stats = report["stats"]
+        out.write(f"Max profit at expiration: {stats['max_profit']:.2f}\n")
+        out.write(f"Max loss at expiration: {stats['max_loss']:.2f}\n")
+        out.write(f"Breakevens at expiration: {', '.join(f'{p:.2f}' for p in stats['expiry_breakevens']) or '-'}\n")
+        out.write(f"Current breakevens: {', '.join(f'{p:.2f}' for p in stats['current_breakevens']) or '-'}\n\n")
+        out.write(f"{'Price':>12} {'Payoff at Expiration':>22} {'Current Payoff':>16}\n")
+        for price, expiry, current in rows:
+            out.write(f"{price:>12.2f} {expiry:>22.2f} {current:>16.2f}\n")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    enable_from_argv()
+    parser = argparse.ArgumentParser(description="Print the PnL table, breakevens and stats of a book")
+    parser.add_argument("source", help="book spec JSON file or strategy script name")
+    parser.add_argument("--format", choices=FORMATS, default="text")
+    parser.add_argument("--lower", type=float)
+    parser.add_argument("--upper", type=float)
+    parser.add_argument("--points", type=int, default=400)
+    parser.add_argument("--today", type=datetime.fromisoformat, help="valuation date, default today")
+    parser.add_argument("--spot", type=float, help="current price marker for --plot, default mid-range")
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    parser.add_argument("--plot", action="store_true", help="also show the payoff chart")
+    args = parser.parse_args()
+
+    report = build_report(load_spec(args.source), args.lower, args.upper, args.points, args.today, args.spot)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            write_report(report, f, args.format)
+    else:
+        write_report(report, sys.stdout, args.format)
+    if args.plot:
+        get(report["graph"], "figure")
+        with stage("import"):
+            import matplotlib.pyplot as plt
+        plt.show()
@@ -0,0 +1,160 @@
+from datetime import datetime
+
+import numpy as np
+
+from book import add_linear, add_lp, add_option, compile_book, new_book, revalue_legs
+
+# Book risk netted by (underlying, expiry) bucket on a ladder of relative spot shocks.
+# Options bucket on their expiry, dated futures on theirs; spot, perp and LP legs have no expiry
+# and land in the underlying's "none" bucket. Every metric is a (n_buckets, n_shocks) array:
+#   pnl   - current PnL (Black-Scholes for options) at spot * (1 + shock)
+#   delta, gamma, vega - vega per 1.00 of volatility, like pricing.black_scholes_greeks
+# The state caches every position's per-leg rows so replacing one position only touches its own legs.
+
+METRICS = ("pnl", "delta", "gamma", "vega")
+NO_EXPIRY = 2**31 - 1  # Expiry day used for legs without an expiry
+KEY_SPAN = 2**31  # Bucket key = underlying code * KEY_SPAN + expiry day
+
+
+# Per-leg risk rows for a compiled book: underlying names, expiry days and one row per leg for every metric
+def leg_risk(arrays, spot, shocks, today=None):
+    shocks = np.asarray(shocks, dtype=float)
+    opt, lin, lp = arrays["option"], arrays["linear"], arrays["lp"]
+    spot_by_code = np.array([spot[name] for name in arrays["underlyings"]], dtype=float)
+    underlying = np.concatenate([opt["underlying"], lin["underlying"], lp["underlying"]])
+    values = revalue_legs(arrays, spot_by_code[underlying][:, None] * (1 + shocks), today, greeks=True)
+
+    expiry_day = np.concatenate([opt["expiry"], lin["expiry"], np.full(len(lp["L"]), np.datetime64("NaT", "s"))])
+    days = np.full(len(expiry_day), NO_EXPIRY, dtype=np.int64)
+    days[~np.isnat(expiry_day)] = expiry_day[~np.isnat(expiry_day)].astype("datetime64[D]").astype(np.int64)
+    legs = {"underlying": underlying, "expiry_day": days, "pos": np.concatenate([opt["pos"], lin["pos"], lp["pos"]])}
+    for metric in METRICS:
+        legs[metric] = values[metric]
+    return legs
+
+
+# Bucket keys for per-leg rows, with local underlying codes mapped onto the state's underlying list
+def _bucket_keys(state, names, legs):
+    codes = []
+    for name in names:
+        if name not in state["underlyings"]:
+            state["underlyings"].append(name)
+        codes.append(state["underlyings"].index(name))
+    codes = np.asarray(codes, dtype=np.int64)
+    return codes[legs["underlying"]] * KEY_SPAN + legs["expiry_day"]
+
+
+# Bucket rows for keys, appending empty buckets for keys the state has not seen yet
+def _bucket_rows(state, keys):
+    unseen = [key for key in np.unique(keys).tolist() if key not in state["bucket_id"]]
+    if unseen:
+        for key in unseen:
+            state["bucket_id"][key] = len(state["keys"])
+            state["keys"].append(key)
+        for metric in METRICS:
+            grown = np.zeros((len(unseen), state[metric].shape[1]))
+            state[metric] = np.vstack([state[metric], grown])
+    return np.array([state["bucket_id"][key] for key in keys.tolist()], dtype=np.intp)
+
+
+# Aggregate a compiled book into buckets: one sort, then reduceat over each run of equal keys
+def build_risk(arrays, spot, shocks, today=None):
+    today = datetime.today() if today is None else today
+    shocks = np.asarray(shocks, dtype=float)
+    state = {"underlyings": [], "spot": dict(spot), "shocks": shocks, "today": today, "keys": [],
+             "bucket_id": {}, "positions": {}}
+    legs = leg_risk(arrays, spot, shocks, today)
+    keys = _bucket_keys(state, arrays["underlyings"], legs)
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(keys) else np.empty(0, int)
+    state["keys"] = sorted_keys[starts].tolist()
+    state["bucket_id"] = {key: i for i, key in enumerate(state["keys"])}
+    for metric in METRICS:
+        rows = legs[metric][order]
+        state[metric] = np.add.reduceat(rows, starts, axis=0) if len(starts) else np.zeros((0, len(shocks)))
+
+    # Per-position cache of bucket rows and leg rows, split off a sort by position id
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(keys)]))[np.argsort(order)]
+    order = np.argsort(legs["pos"], kind="stable")
+    bounds = np.searchsorted(legs["pos"][order], np.arange(len(arrays["positions"]) + 1))
+    for i, name in enumerate(arrays["positions"]):
+        rows = order[bounds[i]:bounds[i + 1]]
+        state["positions"][name] = {"bucket": bucket[rows]} | {metric: legs[metric][rows] for metric in METRICS}
+    return state
+
+
+# Replace one position's legs (a book holding only that position; None or an empty book removes it)
+def update_position(state, position, book=None):
+    old = state["positions"].pop(position, None)
+    if old is not None:
+        for metric in METRICS:
+            np.subtract.at(state[metric], old["bucket"], old[metric])
+    if book is None or not any(book[kind] for kind in book):
+        return state
+
+    arrays = compile_book(book)
+    legs = leg_risk(arrays, state["spot"], state["shocks"], state["today"])
+    bucket = _bucket_rows(state, _bucket_keys(state, arrays["underlyings"], legs))
+    for metric in METRICS:
+        np.add.at(state[metric], bucket, legs[metric])
+    state["positions"][position] = {"bucket": bucket} | {metric: legs[metric] for metric in METRICS}
+    return state
+
+
+# (underlying, expiry) label of every bucket; expiry is "none" for legs without one
+def bucket_labels(state):
+    labels = []
+    for key in state["keys"]:
+        code, day = divmod(key, KEY_SPAN)
+        expiry = "none" if day == NO_EXPIRY else str(np.datetime64(day, "D"))
+        labels.append((state["underlyings"][code], expiry))
+    return labels
+
+
+# Buckets netted down to one row per underlying
+def by_underlying(state):
+    codes = np.array([key // KEY_SPAN for key in state["keys"]], dtype=np.intp)
+    totals = {}
+    for metric in METRICS:
+        totals[metric] = np.zeros((len(state["underlyings"]), len(state["shocks"])))
+        np.add.at(totals[metric], codes, state[metric])
+    return state["underlyings"], totals
+
+
+if __name__ == "__main__":
+    import time
+
+    # A synthetic desk: thousands of option positions across expiries plus perp hedges and LPs on two underlyings
+    rng = np.random.default_rng(0)
+    spot = {"ETH": 2650.0, "BTC": 64000.0}
+    expiries = ["11/27/2026", "12/25/2026", "01/29/2027", "03/26/2027", "06/25/2027"]
+    book = new_book()
+    for i in range(20000):
+        underlying = "ETH" if i % 3 else "BTC"
+        strike = round(spot[underlying] * rng.uniform(0.7, 1.3), -1)
+        add_option(book, "call" if rng.random() < 0.5 else "put", strike, expiries[i % len(expiries)],
+                   rng.uniform(0.45, 0.75), rng.uniform(10, 300), rng.choice([-2, -1, 1, 2]),
+                   position=f"pos{i // 4}", underlying=underlying)
+    for i in range(200):
+        add_linear(book, 2650, -rng.uniform(1, 5), position=f"hedge{i}", kind="perp", leverage=5)
+        add_lp(book, 10000, 2650, 2200, 3100, position=f"lp{i}")
+
+    shocks = np.linspace(-0.3, 0.3, 61)
+    start = time.perf_counter()
+    state = build_risk(compile_book(book), spot, shocks)
+    print(f"Built {len(state['keys'])} buckets from {sum(len(book[k]) for k in book)} legs "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    replacement = new_book()
+    add_option(replacement, "put", 2400, "12/25/2026", 0.6, 80, 10, position="pos7")
+    start = time.perf_counter()
+    update_position(state, "pos7", replacement)
+    print(f"Updated one position in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    at_spot = len(shocks) // 2
+    print(f"{'underlying':<10} {'expiry':<12} {'delta':>10} {'gamma':>10} {'vega':>12} {'pnl':>12}")
+    for i, (underlying, expiry) in enumerate(bucket_labels(state)):
+        print(f"{underlying:<10} {expiry:<12} {state['delta'][i, at_spot]:>10.2f} {state['gamma'][i, at_spot]:>10.4f} "
+              f"{state['vega'][i, at_spot]:>12.1f} {state['pnl'][i, at_spot]:>12.1f}")
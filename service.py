@@ -0,0 +1,311 @@
+import asyncio
+import io
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from book import book_from_spec, compile_book, evaluate_book
+from instrument import stage
+
+# Local HTTP PnL service on asyncio streams (no web framework needed).
+#   POST /pnl       {"legs": [...], "lower_range", "upper_range", "n_points", "today"} -> curves on the grid
+#   POST /sweep     {"legs": [...], "sweeps": {"<leg>.<field>": [...]}, "lower_range", ...} -> sweep.sweep, process pool
+#   POST /simulate  {"legs": [...], "spot", "sigma", "days", "n_paths", "seed"} -> paths.simulate_book_paths, process pool
+#   GET  /stats     latency histograms per endpoint and the batch size histogram
+# /pnl requests that arrive within BATCH_WINDOW of each other and share a grid and date are priced in
+# one evaluate_book call, each request's legs becoming one position of the combined book.
+# Send "Accept: application/octet-stream" to get the arrays back as an .npz file instead of JSON.
+
+BATCH_WINDOW = 0.002  # Seconds to wait for more /pnl requests after the first
+MAX_BATCH = 256
+LATENCY_EDGES_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BATCH_EDGES = (1, 2, 4, 8, 16, 32, 64, 128)
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+# Empty histogram over bucket edges (the last bucket is everything above the last edge)
+def new_histogram(edges):
+    return {"edges": list(edges), "counts": [0] * (len(edges) + 1), "total": 0.0, "n": 0}
+
+
+# Count one observation
+def observe(histogram, value):
+    histogram["counts"][int(np.searchsorted(histogram["edges"], value))] += 1
+    histogram["total"] += value
+    histogram["n"] += 1
+
+
+# (lower_range, upper_range, n_points) of a request: two numbers and an integer, or ValueError
+def _grid_params(request):
+    lower_range, upper_range = request.get("lower_range", 1700), request.get("upper_range", 3500)
+    n_points = request.get("n_points", 400)
+    for name, value in (("lower_range", lower_range), ("upper_range", upper_range)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name} must be a number, got {value!r}")
+    if isinstance(n_points, bool) or not isinstance(n_points, int):
+        raise ValueError(f"n_points must be an integer, got {n_points!r}")
+    return lower_range, upper_range, n_points
+
+
+# Price grid and valuation date of a request; requests without a date are valued at now (default: datetime.today())
+def _grid(request, now=None):
+    S = np.linspace(*_grid_params(request))
+    if "today" in request:
+        return S, datetime.fromisoformat(request["today"])
+    return S, datetime.today() if now is None else now
+
+
+# Price a batch of books (one per /pnl request) sharing one grid and date: one combined book, one position per request
+def price_batch(books, S, today):
+    book = {"option": [], "linear": [], "lp": []}
+    for i, part in enumerate(books):
+        for kind in book:
+            book[kind] += [dict(leg, position=i) for leg in part[kind]]
+    result = evaluate_book(compile_book(book), S, today)
+    rows = {name: i for i, name in enumerate(result["positions"])}
+    responses = []
+    for i in range(len(books)):
+        row = rows.get(i)
+        curves = {"S": S}
+        for key in ("expiry_pnl", "current_pnl", "delta", "gamma"):
+            curves[key] = result["position_" + key][row] if row is not None else np.zeros_like(S)
+        responses.append(curves)
+    return responses
+
+
+# Sweep job for the process pool
+def run_sweep(request):
+    from sweep import sweep
+
+    S, today = _grid(request)
+    sweeps = {key: np.asarray(values) for key, values in request["sweeps"].items()}
+    result = sweep({"legs": request["legs"]}, sweeps, S, today, request.get("spot"))
+    return {"S": S, "expiry_pnl": result["expiry_pnl"], "current_pnl": result["current_pnl"]} | {
+        "stats." + name: values for name, values in result["stats"].items()}
+
+
+# Monte Carlo job for the process pool: GBM paths of the underlying and the book's PnL at the horizon
+def run_simulation(request):
+    from paths import gbm_paths, simulate_book_paths
+
+    _, today = _grid(request)
+    days, steps_per_day = request.get("days", 30), request.get("steps_per_day", 1)
+    paths = gbm_paths(request["spot"], request["sigma"], days, request.get("n_paths", 10000), steps_per_day,
+                      seed=request.get("seed"))
+    result = simulate_book_paths(compile_book(book_from_spec({"legs": request["legs"]})), paths,
+                                 1 / (365 * steps_per_day), today)
+    pnl = result["pnl"]
+    return {"pnl_quantiles": np.quantile(pnl, [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]), "mean": pnl.mean(),
+            "histogram": np.histogram(pnl, bins=50)[0], "bin_edges": np.histogram_bin_edges(pnl, bins=50)}
+
+
+# Response body: JSON with arrays as lists, or an .npz archive
+def encode(arrays, binary):
+    with stage("export"):
+        if binary:
+            buffer = io.BytesIO()
+            np.savez(buffer, **{name: np.asarray(values) for name, values in arrays.items()})
+            return buffer.getvalue(), "application/octet-stream"
+        body = {name: np.asarray(values).tolist() if isinstance(values, np.ndarray) else values
+                for name, values in arrays.items()}
+        return json.dumps(body).encode(), "application/json"
+
+
+# Service state: batching queue, process pool and histograms.
+# Workers are spawned rather than forked so they do not inherit open client sockets and hold connections open.
+def new_service(workers=None):
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    return {"queue": asyncio.Queue(), "pool": pool,
+            "latency": {path: new_histogram(LATENCY_EDGES_MS) for path in ("/pnl", "/sweep", "/simulate")},
+            "batch_size": new_histogram(BATCH_EDGES)}
+
+
+# Collect /pnl requests for up to BATCH_WINDOW, group them by grid and date and price each group at once
+async def batcher(service):
+    queue = service["queue"]
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        observe(service["batch_size"], len(batch))
+
+        # Requests are grouped on the exact valuation datetime they are priced with: undated requests share
+        # one now per batch, and never mix with explicit dates (whole days to expiry depend on the time of day)
+        # Client futures may already be cancelled (the client went away), so results are only set on pending ones
+        now = datetime.today()
+        groups = {}
+        for request, future in batch:
+            try:
+                _, today = _grid(request, now)
+                key = (*_grid_params(request), today)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+                continue
+            groups.setdefault(key, []).append((request, future))
+        for (lower_range, upper_range, n_points, today), members in groups.items():
+            # Each request is parsed and compiled on its own first, so a bad spec only fails its own request
+            books, futures = [], []
+            for request, future in members:
+                try:
+                    book = book_from_spec({"legs": request["legs"]})
+                    compile_book(book)
+                    books.append(book)
+                    futures.append(future)
+                except Exception as error:
+                    if not future.done():
+                        future.set_exception(error)
+            if not books:
+                continue
+            S = np.linspace(lower_range, upper_range, n_points)
+            try:
+                responses = price_batch(books, S, today)
+            except Exception:
+                # The merged evaluation failed: price every request alone so only the bad ones fail
+                responses = []
+                for book in books:
+                    try:
+                        responses.append(price_batch([book], S, today)[0])
+                    except Exception as error:
+                        responses.append(error)
+            for future, response in zip(futures, responses):
+                if future.done():
+                    continue
+                if isinstance(response, Exception):
+                    future.set_exception(response)
+                else:
+                    future.set_result(response)
+
+
+# Route one parsed request to its handler; returns (status, body, content type)
+async def dispatch(service, method, path, body, binary):
+    if method == "GET" and path == "/stats":
+        return 200, json.dumps({"latency_ms": service["latency"], "batch_size": service["batch_size"]}).encode(), \
+            "application/json"
+    if method != "POST" or path not in service["latency"]:
+        return 404, b"{}", "application/json"
+    request = json.loads(body)
+    if path == "/pnl":
+        future = asyncio.get_running_loop().create_future()
+        await service["queue"].put((request, future))
+        result = await future
+    else:
+        job = run_sweep if path == "/sweep" else run_simulation
+        result = await asyncio.get_running_loop().run_in_executor(service["pool"], job, request)
+    return (200, *encode(result, binary))
+
+
+# Serve HTTP/1.1 requests on one connection (keep-alive) until the client closes it
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            path, headers, parsed = None, {}, False
+            start = time.perf_counter()
+            try:
+                method, path, _ = request_line.decode().split(" ", 2)
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                parsed = True
+
+                start = time.perf_counter()
+                binary = "application/octet-stream" in headers.get("accept", "")
+                status, payload, content_type = await dispatch(service, method, path, body, binary)
+            except (ValueError, KeyError, TypeError) as error:
+                status, payload, content_type = 400, json.dumps({"error": str(error)}).encode(), "application/json"
+            except Exception as error:
+                status, payload, content_type = 500, json.dumps({"error": str(error)}).encode(), "application/json"
+            if path in service["latency"]:
+                observe(service["latency"][path], (time.perf_counter() - start) * 1000)
+
+            writer.write(f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+            await writer.drain()
+            # After a malformed request line or length the rest of the stream cannot be framed, so stop here
+            if not parsed or headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+# Start the service; returns the asyncio server
+async def serve(host="127.0.0.1", port=8765, workers=None):
+    service = new_service(workers)
+    service["batcher"] = asyncio.create_task(batcher(service))
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    service["server"] = server
+    return service
+
+
+# Load test client: n_clients keep-alive connections sending requests_each /pnl requests
+async def load_test(host, port, n_clients=50, requests_each=20):
+    spec = {"legs": [
+        {"type": "put", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 128.85,
+         "num_contracts": -1},
+        {"type": "call", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.495, "premium": 142.11,
+         "num_contracts": -1}]}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in range(requests_each):
+            body = json.dumps(spec).encode()
+            writer.write(f"POST /pnl HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            headers = {}
+            await reader.readline()
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers["content-length"]))
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(n_clients)))
+    return n_clients * requests_each / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python service.py [port]          serve until interrupted
+    # python service.py [port] --bench  serve, run a local load test and print the stats
+    port = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 8765
+
+    async def main():
+        service = await serve(port=port)
+        if "--bench" in sys.argv:
+            rate = await load_test("127.0.0.1", port)
+            print(f"{rate:.0f} requests / s")
+            histogram = service["latency"]["/pnl"]
+            print(f"/pnl latency ms: mean {histogram['total'] / histogram['n']:.2f}, "
+                  f"buckets {dict(zip([*histogram['edges'], 'inf'], histogram['counts']))}")
+            print(f"batch sizes: {dict(zip([*service['batch_size']['edges'], 'inf'], service['batch_size']['counts']))}")
+            service["pool"].shutdown()
+            return
+        print(f"Serving on http://127.0.0.1:{port}")
+        async with service["server"]:
+            await service["server"].serve_forever()
+
+    asyncio.run(main())
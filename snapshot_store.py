@@ -0,0 +1,229 @@
+import json
+import os
+
+import numpy as np
+
+from chain_store import read_export
+
+# Append-only store of chain snapshots, partitioned by day:
+#   <root>/meta.json                 underlying vocabulary
+#   <root>/<YYYY-MM-DD>/<column>.bin raw little-endian column data, appended per snapshot
+#   <root>/<YYYY-MM-DD>/snapshots.bin (timestamp, first row, row count) per snapshot
+# Column data is written before the snapshot index entry, so a reader never sees a half-written snapshot.
+# Rows inside a snapshot are sorted by (underlying, expiry, call/put, strike), so every expiry is a
+# contiguous block and reads are zero-copy slices of np.memmap views. compact_day() turns a finished day
+# into one compressed .npz; compacted days are decompressed into memory when read.
+
+COLUMN_TYPES = {
+    "underlying": np.int16,
+    "expiry": "datetime64[D]",
+    "is_call": np.bool_,
+    "strike": np.float64,
+    "bid": np.float64,
+    "ask": np.float64,
+    "mark": np.float64,
+    "iv": np.float64,
+    "underlying_price": np.float64,
+}
+INDEX_TYPE = np.dtype([("timestamp", "datetime64[s]"), ("start", np.int64), ("count", np.int64)])
+
+
+# Underlying vocabulary shared by every partition
+def _load_underlyings(root):
+    path = os.path.join(root, "meta.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["underlyings"]
+
+
+# Persist the vocabulary after new underlyings appear
+def _save_underlyings(root, underlyings):
+    with open(os.path.join(root, "meta.json"), "w") as f:
+        json.dump({"underlyings": underlyings}, f)
+
+
+# Sorted columns for one snapshot from chain_store.read_export style records
+def snapshot_columns(records, underlyings):
+    columns = {
+        "underlying": np.array([underlyings.index(rec["underlying"]) for rec in records], dtype=np.int16),
+        "expiry": np.array([rec["expiry"] for rec in records], dtype="datetime64[D]"),
+        "is_call": np.array([rec["is_call"] for rec in records], dtype=bool),
+    }
+    for name in ("strike", "bid", "ask", "mark", "iv", "underlying_price"):
+        columns[name] = np.array([rec.get(name, np.nan) for rec in records], dtype=float)
+    return columns
+
+
+# Last snapshot index entry of a day partition, or None for an empty partition
+def _last_entry(index_path):
+    if not os.path.exists(index_path) or os.path.getsize(index_path) < INDEX_TYPE.itemsize:
+        return None
+    with open(index_path, "rb") as f:
+        f.seek(-INDEX_TYPE.itemsize, os.SEEK_END)
+        return np.frombuffer(f.read(INDEX_TYPE.itemsize), INDEX_TYPE)[0]
+
+
+# Append one snapshot (records or already built columns) taken at `timestamp`
+def append_snapshot(root, timestamp, records=None, columns=None):
+    os.makedirs(root, exist_ok=True)
+    timestamp = np.datetime64(timestamp, "s")
+    if columns is None:
+        underlyings = _load_underlyings(root)
+        new = sorted({rec["underlying"] for rec in records} - set(underlyings))
+        if new:
+            underlyings += new
+            _save_underlyings(root, underlyings)
+        columns = snapshot_columns(records, underlyings)
+    order = np.lexsort((columns["strike"], columns["is_call"], columns["expiry"], columns["underlying"]))
+
+    day_dir = os.path.join(root, str(timestamp.astype("datetime64[D]")))
+    if os.path.exists(day_dir + ".npz"):
+        raise ValueError(f"Day {os.path.basename(day_dir)} is already compacted")
+    index_path = os.path.join(day_dir, "snapshots.bin")
+    last = _last_entry(index_path)
+    # Readers binary-search the timestamps of a day, so snapshots must arrive in time order
+    if last is not None and timestamp < last["timestamp"]:
+        raise ValueError(f"Snapshot at {timestamp} is older than the last one stored ({last['timestamp']})")
+    start = 0 if last is None else int(last["start"] + last["count"])
+    os.makedirs(day_dir, exist_ok=True)
+    for name, dtype in COLUMN_TYPES.items():
+        with open(os.path.join(day_dir, f"{name}.bin"), "ab") as f:
+            # Drop rows left behind by an append that never reached the index
+            f.truncate(start * np.dtype(dtype).itemsize)
+            f.write(np.ascontiguousarray(columns[name][order], dtype=dtype).tobytes())
+    entry = np.array([(timestamp, start, len(order))], dtype=INDEX_TYPE)
+    with open(index_path, "ab") as f:
+        f.write(entry.tobytes())
+    return start
+
+
+# Append a snapshot straight from an exchange export file
+def append_export(root, timestamp, path):
+    return append_snapshot(root, timestamp, records=read_export(path))
+
+
+# Memory-mapped columns and snapshot index of one day (or the decompressed arrays of a compacted day)
+def open_day(root, day):
+    day = str(day)
+    compacted = os.path.join(root, day + ".npz")
+    if os.path.exists(compacted):
+        with np.load(compacted) as data:
+            return {name: data[name] for name in data.files}
+    day_dir = os.path.join(root, day)
+    index_path = os.path.join(day_dir, "snapshots.bin")
+    if not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+        return None
+    index = np.memmap(index_path, INDEX_TYPE, mode="r")
+    rows = int(index["start"][-1] + index["count"][-1])
+    data = {"snapshots": index}
+    for name, dtype in COLUMN_TYPES.items():
+        data[name] = np.memmap(os.path.join(day_dir, f"{name}.bin"), dtype, mode="r", shape=(rows,)) if rows \
+            else np.empty(0, dtype)
+    return data
+
+
+# Days with data between two timestamps, oldest first
+def days_between(root, t0, t1):
+    first, last = np.datetime64(t0, "D"), np.datetime64(t1, "D")
+    days = []
+    for name in sorted(os.listdir(root)):
+        day = name[:-4] if name.endswith(".npz") else name
+        if name == "meta.json" or day in days:
+            continue
+        if first <= np.datetime64(day, "D") <= last:
+            days.append(day)
+    return days
+
+
+# Yield (timestamp, columns) for every snapshot in [t0, t1]; columns are zero-copy slices
+def iter_snapshots(root, t0, t1):
+    t0, t1 = np.datetime64(t0, "s"), np.datetime64(t1, "s")
+    for day in days_between(root, t0, t1):
+        data = open_day(root, day)
+        if data is None:
+            continue
+        index = data["snapshots"]
+        lo = np.searchsorted(index["timestamp"], t0, side="left")
+        hi = np.searchsorted(index["timestamp"], t1, side="right")
+        for timestamp, start, count in index[lo:hi]:
+            yield timestamp, {name: data[name][start:start + count] for name in COLUMN_TYPES}
+
+
+# Rows of one expiry (optionally one underlying / call or put) in a snapshot's columns, as a slice.
+# Rows are sorted by underlying first, so without underlying_code the snapshot must hold a single underlying.
+def expiry_block(columns, expiry, underlying_code=None, kind=None):
+    expiry = np.datetime64(expiry, "D")
+    lo, hi = 0, len(columns["expiry"])
+    if underlying_code is None and hi and columns["underlying"][0] != columns["underlying"][-1]:
+        raise ValueError("Snapshot holds several underlyings: pass underlying_code")
+    if underlying_code is not None:
+        lo, hi = np.searchsorted(columns["underlying"], [underlying_code, underlying_code + 1])
+    lo, hi = lo + np.searchsorted(columns["expiry"][lo:hi], [expiry, expiry + 1])
+    if kind is not None:
+        is_call = int(kind == "call")
+        lo, hi = lo + np.searchsorted(columns["is_call"][lo:hi], [is_call, is_call + 1])
+    return slice(int(lo), int(hi))
+
+
+# One sortable int64 per (underlying, expiry, call/put, strike rank), in the snapshot's row order
+# (like chain_store._index_key: exact for any strike, where a float key would round close strikes together)
+def snapshot_keys(underlying, expiry, is_call, strike_rank, n_strikes):
+    days = np.asarray(expiry, dtype="datetime64[D]").astype(np.int64)
+    group = (np.asarray(underlying, dtype=np.int64) * 1_000_000 + days) * 2 + np.asarray(is_call, dtype=np.int64)
+    return group * (n_strikes + 1) + strike_rank
+
+
+# Row numbers of many legs inside one snapshot (-1 where the snapshot has no quote)
+def locate(columns, underlying_code, expiry, is_call, strike):
+    strike = np.asarray(strike, dtype=float)
+    strikes = np.unique(columns["strike"])
+    if len(strikes) == 0:
+        return np.full(np.broadcast(underlying_code, expiry, is_call, strike).shape, -1)
+    keys = snapshot_keys(columns["underlying"], columns["expiry"], columns["is_call"],
+                         np.searchsorted(strikes, columns["strike"]), len(strikes))
+    rank = np.minimum(np.searchsorted(strikes, strike), len(strikes) - 1)
+    wanted = snapshot_keys(underlying_code, expiry, is_call, rank, len(strikes))
+    rows = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    return np.where((keys[rows] == wanted) & (strikes[rank] == strike), rows, -1)
+
+
+# All quotes for one expiry between t0 and t1: a list of (timestamp, columns). With one underlying the columns
+# are zero-copy slices; without one, the expiry block of every underlying is looked up and concatenated.
+def query(root, expiry, t0, t1, underlying=None, kind=None):
+    underlyings = _load_underlyings(root)
+    codes = [underlyings.index(underlying)] if underlying is not None else range(len(underlyings))
+    results = []
+    for timestamp, columns in iter_snapshots(root, t0, t1):
+        blocks = [expiry_block(columns, expiry, code, kind) for code in codes]
+        if len(blocks) == 1:
+            results.append((timestamp, {name: values[blocks[0]] for name, values in columns.items()}))
+        else:
+            results.append((timestamp, {name: np.concatenate([values[block] for block in blocks])
+                                        for name, values in columns.items()}))
+    return results
+
+
+# Rewrite a finished day partition as one compressed .npz and drop the raw column files
+def compact_day(root, day):
+    data = open_day(root, day)
+    if data is None:
+        return
+    np.savez_compressed(os.path.join(root, str(day) + ".npz"), **{name: np.asarray(v) for name, v in data.items()})
+    day_dir = os.path.join(root, str(day))
+    del data
+    for name in list(COLUMN_TYPES) + ["snapshots"]:
+        os.remove(os.path.join(day_dir, f"{name}.bin"))
+    os.rmdir(day_dir)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Append exchange exports as snapshots: python snapshot_store.py <root> <timestamp> <export> [...]
+    root, timestamp = sys.argv[1], sys.argv[2]
+    for path in sys.argv[3:]:
+        start = time.perf_counter()
+        append_export(root, timestamp, path)
+        print(f"Appended {path} in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,93 @@
+# Leg structures of the strategy scripts: (leg name, call / put, contracts per unit).
+# Negative contracts are short legs. Strikes are chosen separately (by hand, delta or offset).
+STRATEGIES = {
+    "iron_condor": [("long_put", "put", 1), ("short_put", "put", -1), ("short_call", "call", -1),
+                    ("long_call", "call", 1)],
+    "short_strangle": [("short_put", "put", -1), ("short_call", "call", -1)],
+    "call_ratio_spread": [("long_call", "call", 1), ("short_call", "call", -4)],
+}
+
+
+# Legs of a named structure, scaled by num_contracts
+def strategy_legs(name, num_contracts=1):
+    return [(leg, kind, qty * num_contracts) for leg, kind, qty in STRATEGIES[name]]
+
+
+# Option leg in book spec form (iv as a fraction; num_contracts < 0 for short legs)
+def _option(kind, strike, expiration_date, iv, premium, num_contracts):
+    return {"type": kind, "strike": strike, "expiration_date": expiration_date, "iv": iv, "premium": premium,
+            "num_contracts": num_contracts}
+
+
+# Every strategy script as a book spec with its own price range and inputs, for benchmarks and golden checks
+SCRIPTS = {
+    "bullputspread.py": {"lower_range": 2000, "upper_range": 3500, "legs": [
+        _option("put", 2450, "11/15/2024", 1.048, 21.26, -0.5), _option("put", 2200, "11/15/2024", 0.941, 105.26, 0.5)]},
+    "call.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("call", 2650, "11/15/2024", 0.734, 343.4, 2)]},
+    "call_ladder.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("call", 2800, "11/15/2024", 0.564, 164.47, 2), _option("call", 2900, "11/15/2024", 0.561, 99.69, -2),
+        _option("call", 3000, "11/15/2024", 0.583, 59.74, -2)]},
+    "call_ratio_spread.py": {"lower_range": 1500, "upper_range": 3000, "legs": [
+        _option("call", 2700, "10/25/2024", 0.577, 151.7, 1), _option("call", 2900, "10/25/2024", 0.599, 85.3, -4)]},
+    "callbackspread.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("call", 2100, "11/15/2024", 0.63, 195.4, -1), _option("call", 2400, "11/15/2024", 0.63, 59.3, 2)]},
+    "custom_double_call.py": {"lower_range": 1800, "upper_range": 3500, "legs": [
+        _option("call", 2700, "11/15/2024", 0.615, 224.8, 1), _option("call", 3050, "11/15/2024", 0.615, 41.98, -4)]},
+    "customspread.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("put", 3100, "11/15/2024", 0.62, 85.1, 1), _option("call", 3300, "11/15/2024", 0.62, 132.4, -2),
+        _option("call", 3500, "11/15/2024", 0.62, 71.9, 8)]},
+    "customstrangle.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("put", 2700, "09/27/2024", 0.555, 182.8, 1), _option("call", 2400, "09/27/2024", 0.555, 158, -1)]},
+    "customstrangle_w_call.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("put", 3300, "11/15/2024", 0.68, 118.6, 1), _option("call", 3700, "11/15/2024", 0.68, 131.9, -8),
+        _option("call", 3300, "11/15/2024", 0.68, 321.4, 1.75)]},
+    "diagonal.py": {"lower_range": 3000, "upper_range": 4000, "legs": [
+        _option("call", 3500, "11/15/2024", 0.539, 145.6, -1), _option("call", 3800, "11/30/2024", 0.576, 94.6, 1)]},
+    "ironcondor.py": {"lower_range": 2400, "upper_range": 4000, "legs": [
+        _option("put", 2600, "08/30/2024", 0.60, 25.76, 30), _option("put", 2800, "08/30/2024", 0.60, 54.98, -30),
+        _option("call", 3400, "08/30/2024", 0.60, 76.74, -30), _option("call", 3600, "08/30/2024", 0.60, 46.25, 30)]},
+    "long_butterfly.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("call", 2800, "11/15/2024", 0.585, 167.36, 1), _option("call", 3000, "11/15/2024", 0.585, 60.58, -2),
+        _option("call", 3100, "11/15/2024", 0.585, 39.41, 1)]},
+    "long_callspread.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("call", 3000, "11/15/2024", 0.6305, 68.43, -2), _option("call", 2900, "11/15/2024", 0.6305, 107.11, 2)]},
+    "long_putspread.py": {"lower_range": 1500, "upper_range": 3500, "legs": [
+        _option("put", 3000, "11/15/2024", 0.615, 349.94, 0.5), _option("put", 2550, "11/15/2024", 0.615, 42.00, -1)]},
+    "long_straddle.py": {"lower_range": 2000, "upper_range": 3500, "legs": [
+        _option("put", 2900, "11/15/2024", 0.576, 70.56, 0.75), _option("call", 2900, "11/15/2024", 0.576, 114.33, 0.75)]},
+    "long_straddle_2strike.py": {"lower_range": 1700, "upper_range": 3200, "legs": [
+        _option("put", 2600, "11/01/2024", 0.49, 13.54, 2.5), _option("call", 2650, "11/01/2024", 0.49, 26.25, 3.5)]},
+    "long_straddle_2strike copy.py": {"lower_range": 1700, "upper_range": 3200, "legs": [
+        _option("put", 2500, "11/1/2024", 0.485, 47.68, 12.5), _option("call", 2600, "11/1/2024", 0.485, 49.85, 12.5)]},
+    "put ratio spread.py": {"lower_range": 2000, "upper_range": 3500, "legs": [
+        _option("put", 2700, "11/15/2024", 0.607, 27.07, 1), _option("put", 2600, "11/15/2024", 0.653, 14.4, -4)]},
+    "put.py": {"lower_range": 1700, "upper_range": 3500, "legs": [
+        _option("put", 2900, "11/15/2024", 0.571, 68.74, 1.2)]},
+    "reversecondor.py": {"lower_range": 3100, "upper_range": 3800, "legs": [
+        _option("put", 3400, "06/28/2024", 0.6, 133.7, 20), _option("put", 3200, "06/28/2024", 0.6, 44.9, -20),
+        _option("call", 3700, "06/28/2024", 0.6, 45.8, -20), _option("call", 3500, "06/28/2024", 0.6, 106.6, 20)]},
+    "risk_reversal.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("put", 2800, "11/15/2024", 0.57, 36.44, -1), _option("call", 3000, "11/15/2024", 0.57, 65.63, 3)]},
+    "short_call.py": {"lower_range": 2300, "upper_range": 2700, "legs": [
+        _option("call", 2600, "11/15/2024", 0.738, 52.2, -1)]},
+    "short_straddle.py": {"lower_range": 1700, "upper_range": 3200, "legs": [
+        _option("put", 2425, "11/08/2024", 1.03, 75.76, -0.5), _option("call", 2425, "11/08/2024", 1.03, 85.78, -0.5)]},
+    "short_strangle.py": {"lower_range": 2000, "upper_range": 3500, "legs": [
+        _option("put", 2500, "11/15/2024", 0.647, 3.08, -1), _option("call", 3200, "11/15/2024", 0.647, 29.35, -1)]},
+    "shorteth.py": {"lower_range": 1000, "upper_range": 5000, "legs": [
+        {"type": "linear", "entry_price": 2650.7, "amount": -3}]},
+    "shorteth copy.py": {"lower_range": 1000, "upper_range": 5000, "legs": [
+        {"type": "linear", "entry_price": 2655, "amount": -1}]},
+    "shortput.py": {"lower_range": 1900, "upper_range": 3100, "legs": [
+        _option("put", 2900, "11/15/2024", 0.618, 98.34, -2)]},
+    "syntheticlong.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("call", 2800, "11/15/2024", 0.60, 146.34, 1.5), _option("put", 2800, "11/15/2024", 0.60, 60.19, -1.5)]},
+    "syntheticshort.py": {"lower_range": 2000, "upper_range": 4000, "legs": [
+        _option("call", 3200, "10/11/2024", 0.60, 167.14, -6), _option("put", 3200, "10/11/2024", 0.60, 121.2, 4),
+        _option("call", 3100, "10/11/2024", 0.60, 237.43, 0)]},
+    "univ3.py": {"lower_range": 1950, "upper_range": 2600, "legs": [
+        {"type": "lp", "initial_investment": 10000, "current_price": 2336, "lower_bound": 2150, "upper_bound": 2600}]},
+    "verticalspread.py": {"lower_range": 2500, "upper_range": 3500, "legs": [
+        _option("call", 3000, "08/16/2024", 0.552, 113.3, 5), _option("call", 2900, "08/16/2024", 0.552, 150, -5)]},
+}
@@ -0,0 +1,186 @@
+import numpy as np
+
+from book import r
+from chain_store import chain_slice
+from pricing import black_scholes, norm_cdf
+
+# Enumerates verticals, strangles, butterflies and iron condors on one expiry of a chain and ranks them.
+# Long legs are bought at the ask and short legs sold at the bid (mark when a side is missing).
+# Probability of profit assumes a lognormal terminal price with the given sigma.
+
+
+# One expiry as aligned arrays: strikes plus call / put bid and ask, only strikes quoted on both sides
+def chain_from_store(store, underlying, expiry):
+    calls, puts = chain_slice(store, underlying, expiry, "call"), chain_slice(store, underlying, expiry, "put")
+    strikes, ci, pi = np.intersect1d(calls["strike"], puts["strike"], return_indices=True)
+    chain = {"strikes": strikes}
+    for prefix, quotes, idx in (("call", calls, ci), ("put", puts, pi)):
+        for side in ("bid", "ask"):
+            values = np.asarray(quotes[side])[idx]
+            chain[f"{prefix}_{side}"] = np.where(np.isfinite(values), values, np.asarray(quotes["mark"])[idx])
+    chain["iv"] = (np.asarray(calls["iv"])[ci] + np.asarray(puts["iv"])[pi]) / 2
+    return chain
+
+
+# Probability that the terminal price ends above K
+def prob_above(K, S, T, sigma):
+    with np.errstate(divide="ignore"):
+        d2 = (np.log(S / K) + (r - 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+    return norm_cdf(d2)
+
+
+# Default objective: a rough expected value, max profit * POP - max loss * (1 - POP)
+def expected_value(metrics):
+    return metrics["max_profit"] * metrics["pop"] - metrics["max_loss"] * (1 - metrics["pop"])
+
+
+# Best k candidates by score, best first
+def top_k(candidates, score, k):
+    score = np.where(np.isfinite(score), score, -np.inf)
+    k = min(k, len(score))
+    best = np.argpartition(-score, k - 1)[:k] if k else np.empty(0, int)
+    best = best[np.argsort(-score[best])]
+    return {name: values[best] for name, values in candidates.items()} | {"score": score[best]}
+
+
+# Credit spreads of one side: every (short, long) pair, with long strikes further OTM.
+# Returns index pairs, credit and width, keeping only spreads not dominated by a narrower one on the same short strike.
+def _credit_spreads(strikes, bid, ask, kind):
+    n = len(strikes)
+    short, long = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    valid = long < short if kind == "put" else long > short
+    credit = bid[:, None] - ask[None, :]
+    width = np.abs(strikes[:, None] - strikes[None, :])
+    credit = np.where(valid & (credit > 0), credit, np.nan)
+    # Walk outward from the short strike: a wider spread only survives if it collects more than every narrower one
+    order = np.argsort(np.where(valid, width, np.inf), axis=1, kind="stable")
+    ordered = np.take_along_axis(credit, order, axis=1)
+    best_so_far = np.fmax.accumulate(np.where(np.isnan(ordered), -np.inf, ordered), axis=1)
+    previous = np.concatenate([np.full((n, 1), -np.inf), best_so_far[:, :-1]], axis=1)
+    keep_ordered = np.isfinite(ordered) & (ordered > previous)
+    keep = np.zeros_like(keep_ordered)
+    np.put_along_axis(keep, order, keep_ordered, axis=1)
+    s, l = np.nonzero(keep)
+    return s, l, credit[s, l], width[s, l]
+
+
+# Vertical spreads: bull put / bear call credit spreads and bull call / bear put debit spreads
+def search_verticals(chain, S, T, sigma, objective=expected_value, k=10):
+    strikes = chain["strikes"]
+    lo, hi = np.triu_indices(len(strikes), 1)
+    K_lo, K_hi, width = strikes[lo], strikes[hi], strikes[hi] - strikes[lo]
+    call_bid, call_ask, put_bid, put_ask = chain["call_bid"], chain["call_ask"], chain["put_bid"], chain["put_ask"]
+    # name: (sell strike, buy strike, net premium received, breakeven, profits above the breakeven)
+    verticals = {
+        "bull_put": (K_hi, K_lo, put_bid[hi] - put_ask[lo], lambda net: K_hi - net, True),
+        "bear_call": (K_lo, K_hi, call_bid[lo] - call_ask[hi], lambda net: K_lo + net, False),
+        "bull_call": (K_hi, K_lo, call_bid[hi] - call_ask[lo], lambda net: K_lo - net, True),
+        "bear_put": (K_lo, K_hi, put_bid[lo] - put_ask[hi], lambda net: K_hi + net, False),
+    }
+    results = {}
+    for name, (sell_strike, buy_strike, net, breakeven, bullish) in verticals.items():
+        credit_spread = name in ("bull_put", "bear_call")
+        max_profit = net if credit_spread else width + net
+        max_loss = width - net if credit_spread else -net
+        above = prob_above(breakeven(net), S, T, sigma)
+        metrics = {"sell_strike": sell_strike, "buy_strike": buy_strike, "net_premium": net,
+                   "max_profit": max_profit, "max_loss": max_loss, "breakeven": breakeven(net),
+                   "pop": above if bullish else 1 - above}
+        usable = (max_profit > 0) & (max_loss > 0)
+        metrics = {key: value[usable] for key, value in metrics.items()}
+        results[name] = top_k(metrics, objective(metrics), k)
+    return results
+
+
+# Short strangles: every short put strike below every short call strike
+def search_strangles(chain, S, T, sigma, objective=None, k=10):
+    strikes = chain["strikes"]
+    put, call = np.triu_indices(len(strikes), 1)
+    credit = chain["put_bid"][put] + chain["call_bid"][call]
+    low, high = strikes[put] - credit, strikes[call] + credit
+    # Loss is unlimited, so the default ranking is the credit over the model value of the two options
+    model_value = (black_scholes(S, strikes[put], T, r, sigma, False)
+                   + black_scholes(S, strikes[call], T, r, sigma, True))
+    metrics = {"put_strike": strikes[put], "call_strike": strikes[call], "credit": credit,
+               "max_profit": credit, "max_loss": np.full(len(credit), np.inf), "breakeven_low": low,
+               "breakeven_high": high, "pop": prob_above(low, S, T, sigma) - prob_above(high, S, T, sigma),
+               "edge": credit - model_value}
+    score = metrics["edge"] if objective is None else objective(metrics)
+    return top_k(metrics, score, k)
+
+
+# Long call butterflies with equal wings: buy K - w, sell 2 x K, buy K + w
+def search_butterflies(chain, S, T, sigma, objective=expected_value, k=10):
+    strikes, bid, ask = chain["strikes"], chain["call_bid"], chain["call_ask"]
+    n = len(strikes)
+    middle, lower = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    valid = lower < middle
+    middle, lower = middle[valid], lower[valid]
+    # Equal-width upper wing, when that strike exists
+    upper_strike = 2 * strikes[middle] - strikes[lower]
+    upper = np.searchsorted(strikes, upper_strike)
+    exists = (upper < n) & (strikes[np.minimum(upper, n - 1)] == upper_strike)
+    middle, lower, upper = middle[exists], lower[exists], upper[exists]
+    width = strikes[middle] - strikes[lower]
+    debit = ask[lower] + ask[upper] - 2 * bid[middle]
+    low, high = strikes[lower] + debit, strikes[upper] - debit
+    metrics = {"lower_strike": strikes[lower], "middle_strike": strikes[middle], "upper_strike": strikes[upper],
+               "debit": debit, "max_profit": width - debit, "max_loss": debit, "breakeven_low": low,
+               "breakeven_high": high, "pop": prob_above(low, S, T, sigma) - prob_above(high, S, T, sigma)}
+    usable = (debit > 0) & (width > debit)
+    metrics = {key: value[usable] for key, value in metrics.items()}
+    return top_k(metrics, objective(metrics), k)
+
+
+# Iron condors: every undominated bull put spread combined with every undominated bear call spread above it
+def search_condors(chain, S, T, sigma, objective=expected_value, k=10, chunk=4096):
+    strikes = chain["strikes"]
+    ps, pl, put_credit, put_width = _credit_spreads(strikes, chain["put_bid"], chain["put_ask"], "put")
+    cs, cl, call_credit, call_width = _credit_spreads(strikes, chain["call_bid"], chain["call_ask"], "call")
+
+    best = None
+    for start in range(0, len(ps), chunk):
+        p = np.arange(start, min(start + chunk, len(ps)))[:, None]
+        c = np.arange(len(cs))[None, :]
+        valid = strikes[ps[p]] < strikes[cs[c]]
+        p, c = np.broadcast_arrays(p, c)
+        p, c = p[valid], c[valid]
+        credit = put_credit[p] + call_credit[c]
+        max_loss = np.maximum(put_width[p], call_width[c]) - credit
+        low, high = strikes[ps[p]] - credit, strikes[cs[c]] + credit
+        metrics = {"long_put": strikes[pl[p]], "short_put": strikes[ps[p]], "short_call": strikes[cs[c]],
+                   "long_call": strikes[cl[c]], "credit": credit, "max_profit": credit, "max_loss": max_loss,
+                   "breakeven_low": low, "breakeven_high": high,
+                   "pop": prob_above(low, S, T, sigma) - prob_above(high, S, T, sigma)}
+        usable = max_loss > 0
+        metrics = {key: value[usable] for key, value in metrics.items()}
+        chunk_best = top_k(metrics, objective(metrics), k)
+        if best is None:
+            best = chunk_best
+        else:
+            merged = {key: np.concatenate([best[key], chunk_best[key]]) for key in best}
+            score = merged.pop("score")
+            best = top_k(merged, score, k)
+    return best
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from chain_store import open_store
+
+    # Rank structures on one expiry of a chain store: python strategy_search.py <store> <underlying> <expiry> <spot> <days>
+    store = open_store(sys.argv[1])
+    underlying, expiry, S, days = sys.argv[2], sys.argv[3], float(sys.argv[4]), float(sys.argv[5])
+    T = days / 365.0
+    chain = chain_from_store(store, underlying, expiry)
+    sigma = float(np.nanmedian(chain["iv"]))
+
+    start = time.perf_counter()
+    condors = search_condors(chain, S, T, sigma)
+    print(f"Iron condors on {len(chain['strikes'])} strikes in {time.perf_counter() - start:.2f} s")
+    for i in range(len(condors["score"])):
+        print(f"{condors['long_put'][i]:>8.0f} {condors['short_put'][i]:>8.0f} {condors['short_call'][i]:>8.0f} "
+              f"{condors['long_call'][i]:>8.0f}  credit={condors['credit'][i]:.2f} max_loss={condors['max_loss'][i]:.2f} "
+              f"pop={condors['pop'][i]:.2%}")
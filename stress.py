@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import numpy as np
+
+from book import revalue_legs, years_to_expiry
+
+# Named stress scenarios as rows of one matrix, revalued against every leg of a compiled book at once.
+# Columns: relative spot shock (applied to every underlying), IV multiplier per tenor bucket of the
+# leg's remaining life, and a time jump in days. A new scenario is one more row, nothing else.
+
+TENOR_EDGES = (7, 30, 90)  # Days to expiry splitting the IV buckets: <=7d, <=30d, <=90d, longer
+COLUMNS = ("spot", "iv_7d", "iv_30d", "iv_90d", "iv_long", "days")
+
+
+# One scenario row; iv is a single multiplier or one per tenor bucket (front to back)
+def scenario(spot=0.0, iv=1.0, days=0.0):
+    iv = np.broadcast_to(np.asarray(iv, dtype=float), (len(TENOR_EDGES) + 1,))
+    return np.concatenate([[spot], iv, [days]])
+
+
+# The default catalog; historical days are close-to-close ETH moves with the IV jump that followed
+def default_catalog():
+    return {
+        "ETH -40%, IV x2 overnight": scenario(-0.40, 2.0, 1),
+        "ETH -20%, IV x1.5": scenario(-0.20, 1.5, 1),
+        "ETH -10%, front IV spike": scenario(-0.10, (2.0, 1.6, 1.3, 1.1), 1),
+        "ETH +20%, IV x1.3": scenario(0.20, 1.3, 1),
+        "ETH +30%, IV x0.8": scenario(0.30, 0.8, 1),
+        "Flat, IV crush x0.6": scenario(0.0, 0.6, 1),
+        "Flat, one week of decay": scenario(0.0, 1.0, 7),
+        "Replay 2020-03-12 (ETH -43%)": scenario(-0.43, (2.5, 2.0, 1.6, 1.4), 1),
+        "Replay 2021-05-19 (ETH -27%)": scenario(-0.27, (2.0, 1.7, 1.4, 1.2), 1),
+        "Replay 2022-06-13 (ETH -16%)": scenario(-0.16, (1.6, 1.4, 1.2, 1.1), 1),
+    }
+
+
+# Historical scenarios from a price series: the n worst horizon-day moves, IV unchanged
+def historical_scenarios(dates, prices, n=5, horizon=1, iv=1.0):
+    prices = np.asarray(prices, dtype=float)
+    moves = prices[horizon:] / prices[:-horizon] - 1
+    worst = np.argsort(moves)[:n]
+    return {f"Replay {dates[i + horizon]} ({moves[i]:+.0%})": scenario(moves[i], iv, horizon) for i in worst}
+
+
+# PnL of every position under every scenario against today's mark, shape (n_positions, n_scenarios)
+def run_stress(arrays, spot, catalog, today=None):
+    today = datetime.today() if today is None else today
+    names = list(catalog)
+    matrix = np.array([catalog[name] for name in names]) if names else np.empty((0, len(COLUMNS)))
+    shock, iv_mult, jump = matrix[:, 0], matrix[:, 1:-1], matrix[:, -1] / 365
+    opt, lin, lp = arrays["option"], arrays["linear"], arrays["lp"]
+    spot_by_code = np.array([spot[name] for name in arrays["underlyings"]], dtype=float)
+
+    # Every leg at scenario spot and shortened expiry, options with tenor-bucketed IV, as (n_legs, n_scenarios)
+    S0 = spot_by_code[np.concatenate([opt["underlying"], lin["underlying"], lp["underlying"]])][:, None]
+    tenor = np.searchsorted(TENOR_EDGES, years_to_expiry(opt["expiry"], today) * 365)
+    iv = opt["iv"][:, None] * iv_mult[:, tenor].T
+    shocked = revalue_legs(arrays, S0 * (1 + shock), today, jump=jump, iv=iv)["pnl"]
+    leg_pnl = shocked - revalue_legs(arrays, S0, today)["pnl"]
+    pos = np.concatenate([opt["pos"], lin["pos"], lp["pos"]])
+    position_pnl = np.zeros((len(arrays["positions"]), len(names)))
+    np.add.at(position_pnl, pos, leg_pnl)
+    return {"scenarios": names, "positions": arrays["positions"], "position_pnl": position_pnl,
+            "pnl": position_pnl.sum(axis=0)}
+
+
+# Positions ranked by their worst scenario loss, worst first: (position, worst scenario, pnl)
+def rank_positions(result):
+    worst = np.argmin(result["position_pnl"], axis=1)
+    worst_pnl = result["position_pnl"][np.arange(len(worst)), worst]
+    order = np.argsort(worst_pnl)
+    return [(result["positions"][i], result["scenarios"][worst[i]], float(worst_pnl[i])) for i in order]
+
+
+if __name__ == "__main__":
+    from book import add_lp, add_option, add_linear, compile_book, new_book
+
+    # short_straddle.py, the hedged LP of book.py and a short perp, under the default catalog
+    current_price = 2336
+    book = new_book()
+    add_option(book, "put", 2600, "03/26/2027", 0.495, 128.85, -1, position="Short straddle")
+    add_option(book, "call", 2600, "03/26/2027", 0.495, 142.11, -1, position="Short straddle")
+    add_lp(book, 10000, current_price, 2150, 2600, position="LP")
+    add_option(book, "put", 2300, "03/26/2027", 0.60, 68.74, 1.2, position="LP")
+    add_linear(book, current_price, -1.5, position="Short perp", kind="perp", leverage=5)
+    arrays = compile_book(book)
+
+    result = run_stress(arrays, {"ETH": current_price}, default_catalog())
+    print(f"{'scenario':<32} {'book pnl':>12}")
+    for name, pnl in sorted(zip(result["scenarios"], result["pnl"]), key=lambda item: item[1]):
+        print(f"{name:<32} {pnl:>12.2f}")
+    print()
+    for position, name, pnl in rank_positions(result):
+        print(f"{position:<16} worst: {name:<32} {pnl:>12.2f}")
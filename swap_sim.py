@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+
+from lp_math import lp_liquidity
+
+# Swap simulator over a snapshot of a Uniswap v3 pool's initialized ticks.
+# token0 is WETH and token1 is USDC as in univ3.py, so prices are USDC per WETH and
+# liquidity is in the same units as get_L. Raw on-chain liquidity is converted with
+# L = L_raw / 10 ** ((decimals0 + decimals1) / 2).
+
+
+# Build a pool from sorted tick boundaries (as sqrt prices) and the liquidity net added at each boundary
+def make_pool(sqrt_prices, liquidity_net, price, fee):
+    order = np.argsort(sqrt_prices, kind="stable")
+    sqrt_prices = np.asarray(sqrt_prices, dtype=float)[order]
+    liquidity_net = np.asarray(liquidity_net, dtype=float)[order]
+    # Merge boundaries that appear more than once
+    sqrt_prices, first = np.unique(sqrt_prices, return_index=True)
+    liquidity_net = np.add.reduceat(liquidity_net, first) if len(first) else liquidity_net
+    # Liquidity active between boundary k and k + 1
+    segment_liquidity = np.maximum(np.cumsum(liquidity_net), 0.0)
+    return {"sqrt_prices": sqrt_prices, "segment_liquidity": segment_liquidity,
+            "sqrt_price": float(np.sqrt(price)), "fee": fee}
+
+
+# Load a pool snapshot from JSON ({"price", "fee", "decimals0", "decimals1", "ticks": [{"tick", "liquidity_net"}]})
+# or from a CSV with tick,liquidity_net columns (price / fee / decimals passed in)
+def load_pool(path, price=None, fee=0.0005, decimals0=18, decimals1=6):
+    if path.endswith(".json"):
+        with open(path) as f:
+            snapshot = json.load(f)
+        price = snapshot.get("price", price)
+        fee = snapshot.get("fee", fee)
+        decimals0 = snapshot.get("decimals0", decimals0)
+        decimals1 = snapshot.get("decimals1", decimals1)
+        ticks = np.array([t["tick"] for t in snapshot["ticks"]], dtype=float)
+        liquidity_net = np.array([float(t["liquidity_net"]) for t in snapshot["ticks"]], dtype=float)
+        if price is None and "tick_current" in snapshot:
+            price = 1.0001 ** snapshot["tick_current"] * 10.0 ** (decimals0 - decimals1)
+    else:
+        data = np.genfromtxt(path, delimiter=",", names=True)
+        ticks, liquidity_net = np.atleast_1d(data["tick"]), np.atleast_1d(data["liquidity_net"])
+    # A CSV only holds ticks, so the current price has to come from the caller
+    if price is None:
+        raise ValueError(f"No current price for {path}: pass price= (or price / tick_current in a JSON snapshot)")
+    sqrt_prices = np.sqrt(1.0001 ** ticks * 10.0 ** (decimals0 - decimals1))
+    return make_pool(sqrt_prices, liquidity_net / 10.0 ** ((decimals0 + decimals1) / 2), price, fee)
+
+
+# Build a pool out of LP positions (univ3.py style inputs), useful for what-if liquidity
+def pool_from_positions(initial_investment, entry_price, lower_bound, upper_bound, price, fee=0.0005):
+    L = np.atleast_1d(lp_liquidity(np.asarray(initial_investment, dtype=float), np.asarray(entry_price, dtype=float),
+                                   np.asarray(lower_bound, dtype=float), np.asarray(upper_bound, dtype=float)))
+    lower = np.broadcast_to(np.sqrt(lower_bound), L.shape)
+    upper = np.broadcast_to(np.sqrt(upper_bound), L.shape)
+    return make_pool(np.concatenate([lower, upper]), np.concatenate([L, -L]), price, fee)
+
+
+# Segments crossed by a swap from the current price, in the order they are crossed,
+# with the input consumed and output produced by crossing each one completely
+def _swap_path(pool, zero_for_one):
+    sqrt_prices, liquidity = pool["sqrt_prices"], pool["segment_liquidity"]
+    current = pool["sqrt_price"]
+    k = np.searchsorted(sqrt_prices, current, side="right") - 1
+    if zero_for_one:
+        # Price moves down: from current to boundary k, then segments k - 1, k - 2, ...
+        start = np.append(current, sqrt_prices[k:0:-1]) if k >= 0 else np.empty(0)
+        end = sqrt_prices[k::-1] if k >= 0 else np.empty(0)
+        L = liquidity[k::-1] if k >= 0 else np.empty(0)
+        amount_in = L * (1 / end - 1 / start)
+        amount_out = L * (start - end)
+    else:
+        # Price moves up: from current to boundary k + 1, then segments k + 1, k + 2, ...
+        start = np.append(current, sqrt_prices[k + 1:-1])
+        end = sqrt_prices[k + 1:]
+        L = liquidity[k:-1] if k >= 0 else np.append(0.0, liquidity[:-1])
+        amount_in = L * (end - start)
+        amount_out = L * (1 / start - 1 / end)
+    return start, end, L, amount_in, amount_out
+
+
+# Output amount and final price for a vector of swap sizes.
+# zero_for_one=True sells WETH (amounts in WETH), False buys WETH (amounts in USDC).
+def simulate_swaps(pool, amounts, zero_for_one=True):
+    amounts = np.asarray(amounts, dtype=float)
+    start, end, L, seg_in, seg_out = _swap_path(pool, zero_for_one)
+    if len(seg_in) == 0:
+        return {"amount_out": np.zeros_like(amounts), "final_price": np.full_like(amounts, pool["sqrt_price"] ** 2),
+                "average_price": np.full_like(amounts, np.nan), "filled": np.zeros_like(amounts)}
+    cum_in = np.concatenate([[0.0], np.cumsum(seg_in)])
+    cum_out = np.concatenate([[0.0], np.cumsum(seg_out)])
+
+    amount_in = amounts * (1 - pool["fee"])
+    filled = np.minimum(amount_in, cum_in[-1])
+    # Segment each trade ends in; segments with no liquidity are skipped because cum_in is flat there
+    j = np.clip(np.searchsorted(cum_in, filled, side="right") - 1, 0, len(seg_in) - 1)
+    remainder = filled - cum_in[j]
+    L_j, start_j = L[j], start[j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if zero_for_one:
+            final_sqrt = np.where(L_j > 0, L_j / (L_j / start_j + remainder), start_j)
+            partial_out = L_j * (start_j - final_sqrt)
+        else:
+            final_sqrt = np.where(L_j > 0, start_j + remainder / L_j, start_j)
+            partial_out = L_j * (1 / start_j - 1 / final_sqrt)
+    exhausted = amount_in >= cum_in[-1]
+    final_sqrt = np.where(exhausted, end[-1], final_sqrt)
+    amount_out = np.where(exhausted, cum_out[-1], cum_out[j] + partial_out)
+
+    filled_gross = filled / (1 - pool["fee"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_price = amount_out / filled_gross if zero_for_one else filled_gross / amount_out
+    return {"amount_out": amount_out, "final_price": final_sqrt**2, "average_price": average_price,
+            "filled": filled_gross}
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # Define the pool: a few LP positions around the current price (or load_pool("snapshot.json"))
+    current_price = 2336
+    pool = pool_from_positions([2_000_000, 5_000_000, 1_000_000], current_price,
+                               [2150, 1800, 2300], [2600, 3000, 2400], current_price)
+    sell_sizes = np.linspace(1, 2000, 2000)  # WETH sold
+    buy_sizes = sell_sizes * current_price  # USDC spent
+
+    sells = simulate_swaps(pool, sell_sizes, zero_for_one=True)
+    buys = simulate_swaps(pool, buy_sizes, zero_for_one=False)
+
+    # Plotting execution price against trade size
+    fig, ax = plt.subplots(figsize=(14, 8))
+    ax.plot(sell_sizes, sells["average_price"], label='Average Price Selling WETH', color='red')
+    ax.plot(sell_sizes, sells["final_price"], label='Pool Price After Sell', linestyle='dotted', color='red')
+    ax.plot(sell_sizes, buys["average_price"], label='Average Price Buying WETH', color='green')
+    ax.plot(sell_sizes, buys["final_price"], label='Pool Price After Buy', linestyle='dotted', color='green')
+    ax.axhline(current_price, color='black', linestyle='--', label=f"Current Price = {current_price}")
+    ax.set_xlabel("Trade Size (WETH)")
+    ax.set_ylabel("Price")
+    ax.legend(fontsize=9)
+    ax.grid(True)
+    plt.show()
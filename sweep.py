@@ -0,0 +1,152 @@
+from datetime import datetime
+
+import numpy as np
+
+from book import parse_expiry, revalue_kind, years_to_expiry
+from linear_math import KINDS, initial_margin, liquidation_price
+from lp_math import lp_liquidity
+from pricing import intrinsic_value
+
+# Parameter sweeps over a book spec ({"legs": [...]}, see book.book_from_spec).
+# Sweeps are keyed "<leg index>.<field>", e.g. {"1.strike": np.arange(2600, 2800, 4), "1.num_contracts": ...}.
+# Every swept field becomes one axis; all legs of the Cartesian product are evaluated as a single
+# (*sweep_shape, n_legs, n_prices) tensor and summed over legs.
+# Dated futures carry to their expiration_date like book.evaluate_legs; perp funding is not accrued on a static
+# grid (as in evaluate_book), see paths.simulate_linear_paths for funding over time.
+
+OPTION_FIELDS = ("strike", "iv", "premium", "num_contracts", "expiration_date")
+LINEAR_FIELDS = ("entry_price", "amount", "leverage", "maintenance_margin", "expiration_date")
+LP_FIELDS = ("initial_investment", "current_price", "lower_bound", "upper_bound")
+
+
+# Years to expiry of expiration dates, 0 for undated (spot and perp) legs
+def _years(dates, today):
+    T = np.zeros(len(dates))
+    dated = [i for i, date in enumerate(dates) if date]
+    if dated:
+        T[dated] = years_to_expiry(parse_expiry([dates[i] for i in dated]), today)
+    return T
+
+
+# Per-kind field arrays of shape sweep_shape + (n_legs_of_kind,), with swept values laid along their own axis
+def _leg_tensors(spec, sweeps, sweep_shape, today):
+    groups = {"option": [], "linear": [], "lp": []}
+    for i, leg in enumerate(spec["legs"]):
+        kind = "option" if leg["type"] in ("call", "put") else leg["type"]
+        groups[kind].append(i)
+    fields = {"option": OPTION_FIELDS, "linear": LINEAR_FIELDS, "lp": LP_FIELDS}
+    defaults = {"leverage": 1, "maintenance_margin": 0.005}
+
+    tensors = {}
+    for kind, members in groups.items():
+        tensors[kind] = {}
+        for field in fields[kind]:
+            base = [spec["legs"][i].get(field, defaults.get(field)) for i in members]
+            if field == "expiration_date":
+                base = _years(base, today)
+            tensor = np.empty(sweep_shape + (len(members),))
+            tensor[...] = np.asarray(base, dtype=float)
+            tensors[kind][field] = tensor
+        tensors[kind]["index"] = members
+
+    for axis, (key, values) in enumerate(sweeps.items()):
+        leg_index, field = key.split(".", 1)
+        leg_index = int(leg_index)
+        leg = spec["legs"][leg_index]
+        kind = "option" if leg["type"] in ("call", "put") else leg["type"]
+        if field not in tensors[kind]:
+            raise KeyError(f"Cannot sweep {field} on a {leg['type']} leg")
+        if field == "expiration_date":
+            values = _years(list(values), today)
+        shape = [1] * len(sweep_shape)
+        shape[axis] = len(values)
+        column = tensors[kind]["index"].index(leg_index)
+        tensors[kind][field][..., column] = np.asarray(values, dtype=float).reshape(shape)
+    return groups, tensors
+
+
+# PnL curves (at expiration and today) for every combination of the sweeps, plus summary stats
+def sweep(spec, sweeps, S, today=None, spot=None):
+    today = datetime.today() if today is None else today
+    S = np.asarray(S, dtype=float)
+    sweep_shape = tuple(len(values) for values in sweeps.values())
+    groups, tensors = _leg_tensors(spec, sweeps, sweep_shape, today)
+    grid = S.reshape((1,) * (len(sweep_shape) + 1) + (-1,))
+
+    expiry_pnl = np.zeros(sweep_shape + (len(S),))
+    current_pnl = np.zeros(sweep_shape + (len(S),))
+
+    opt = {field: values[..., None] for field, values in tensors["option"].items() if field != "index"}
+    if groups["option"]:
+        is_call = np.array([spec["legs"][i]["type"] == "call" for i in groups["option"]])[:, None]
+        qty, premium = opt["num_contracts"], opt["premium"]
+        legs = {"strike": opt["strike"], "iv": opt["iv"], "premium": premium, "qty": qty, "is_call": is_call}
+        current_pnl += revalue_kind("option", legs, grid, opt["expiration_date"])["pnl"].sum(axis=-2)
+        expiry_pnl += (qty * (intrinsic_value(grid, opt["strike"], is_call) - premium)).sum(axis=-2)
+
+    lin = {field: values[..., None] for field, values in tensors["linear"].items() if field != "index"}
+    if groups["linear"]:
+        kind = np.array([KINDS.index(spec["legs"][i].get("kind", "spot")) for i in groups["linear"]])[:, None]
+        liquidation = liquidation_price(kind, lin["entry_price"], lin["amount"], lin["leverage"],
+                                        lin["maintenance_margin"])
+        margin = initial_margin(kind, lin["entry_price"], lin["amount"], lin["leverage"])
+        legs = {"kind": kind, "entry": lin["entry_price"], "qty": lin["amount"], "liquidation": liquidation,
+                "margin": margin}
+        current_pnl += revalue_kind("linear", legs, grid, lin["expiration_date"])["pnl"].sum(axis=-2)
+        expiry_pnl += revalue_kind("linear", legs, grid, 0.0)["pnl"].sum(axis=-2)
+
+    lp = {field: values[..., None] for field, values in tensors["lp"].items() if field != "index"}
+    if groups["lp"]:
+        L = lp_liquidity(lp["initial_investment"], lp["current_price"], lp["lower_bound"], lp["upper_bound"])
+        legs = {"L": L, "lower": lp["lower_bound"], "upper": lp["upper_bound"], "initial": lp["initial_investment"]}
+        pnl = revalue_kind("lp", legs, grid)["pnl"].sum(axis=-2)
+        current_pnl += pnl
+        expiry_pnl += pnl
+
+    stats = {"max_profit": expiry_pnl.max(axis=-1), "max_loss": expiry_pnl.min(axis=-1),
+             "current_max_loss": current_pnl.min(axis=-1)}
+    if spot is not None:
+        i = np.clip(np.searchsorted(S, spot), 1, len(S) - 1)
+        weight = (spot - S[i - 1]) / (S[i] - S[i - 1])
+        stats["pnl_at_spot"] = current_pnl[..., i - 1] * (1 - weight) + current_pnl[..., i] * weight
+    dims = list(sweeps) + ["S"]
+    coords = {key: np.asarray(values) for key, values in sweeps.items()} | {"S": S}
+    return {"dims": dims, "coords": coords, "expiry_pnl": expiry_pnl, "current_pnl": current_pnl, "stats": stats}
+
+
+# Convert a sweep result into an xarray.Dataset (requires xarray)
+def to_xarray(result):
+    import xarray as xr
+
+    sweep_dims = result["dims"][:-1]
+    data = {"expiry_pnl": (result["dims"], result["expiry_pnl"]),
+            "current_pnl": (result["dims"], result["current_pnl"])}
+    data |= {name: (sweep_dims, values) for name, values in result["stats"].items()}
+    return xr.Dataset(data, coords=result["coords"])
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # long_straddle_2strike.py, sweeping the call strike and the number of call contracts
+    lower_range = 1700
+    upper_range = 3200
+    spot = 2620
+    spec = {"legs": [
+        {"type": "put", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.49, "premium": 13.54,
+         "num_contracts": 2.5},
+        {"type": "call", "strike": 2650, "expiration_date": "03/26/2027", "iv": 0.49, "premium": 26.25,
+         "num_contracts": 3.5},
+    ]}
+    strike_call = np.linspace(2600, 2900, 50)
+    num_call_contracts = np.linspace(0.5, 5, 50)
+    S = np.linspace(lower_range, upper_range, 400)
+
+    result = sweep(spec, {"1.strike": strike_call, "1.num_contracts": num_call_contracts}, S, spot=spot)
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    mesh = ax.pcolormesh(num_call_contracts, strike_call, result["stats"]["max_loss"], cmap="RdYlGn", shading="auto")
+    fig.colorbar(mesh, ax=ax, label="Max Loss at Expiration")
+    ax.set_xlabel("Number of Call Contracts")
+    ax.set_ylabel("Call Strike")
+    plt.show()
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from service import serve
+
+SPEC = {"legs": [{"type": "call", "strike": 2600, "expiration_date": "03/26/2027", "iv": 0.5, "premium": 140,
+                  "num_contracts": 1}], "today": "2024-06-01"}
+
+
+# Send raw bytes on a fresh connection and return (status, body) of the response
+async def _send(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    status_line = await asyncio.wait_for(reader.readline(), 10)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+# POST a JSON body to /pnl
+def _post(port, request):
+    body = json.dumps(request).encode()
+    return _send(port, b"POST /pnl HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body))
+
+
+# Run a coroutine against a service on a free port, shutting it down afterwards
+def _with_service(check):
+    async def main():
+        service = await serve(port=0, workers=1)
+        port = service["server"].sockets[0].getsockname()[1]
+        try:
+            return await check(port)
+        finally:
+            service["server"].close()
+            service["batcher"].cancel()
+            service["pool"].shutdown()
+    return asyncio.run(main())
+
+
+def test_malformed_grid_does_not_stop_the_batcher():
+    async def check(port):
+        bad = await _post(port, dict(SPEC, lower_range=[1700, 1800]))
+        good = await _post(port, SPEC)
+        return bad, good
+
+    (bad_status, bad_body), (good_status, good_body) = _with_service(check)
+    assert bad_status == 400 and "lower_range" in bad_body["error"]
+    assert good_status == 200 and len(good_body["current_pnl"]) == 400
+
+
+def test_malformed_request_line_and_length_get_400():
+    async def check(port):
+        return (await _send(port, b"GARBAGE\r\n\r\n"),
+                await _send(port, b"POST /pnl HTTP/1.1\r\nContent-Length: abc\r\n\r\n"),
+                await _post(port, SPEC))
+
+    line, length, good = _with_service(check)
+    assert line[0] == 400 and length[0] == 400
+    assert good[0] == 200
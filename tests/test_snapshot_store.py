@@ -0,0 +1,27 @@
+import numpy as np
+
+from snapshot_store import append_snapshot, iter_snapshots, locate
+
+
+# Chain records for one underlying: the given (expiry, is_call, strike) rows, marks numbered in order
+def _records(underlying, rows):
+    return [{"underlying": underlying, "expiry": expiry, "is_call": is_call, "strike": strike, "mark": float(i),
+             "underlying_price": 2500.0} for i, (expiry, is_call, strike) in enumerate(rows)]
+
+
+def test_locate_tells_near_identical_strikes_apart_on_second_underlying(tmp_path):
+    records = _records("BTC", [("2024-06-28", True, 60000.0)]) + _records("ETH", [
+        ("2024-06-28", True, 2500.001), ("2024-06-28", True, 2500.002), ("2024-06-28", True, 12_000_000.0),
+        ("2024-07-26", False, 2500.0)])
+    append_snapshot(str(tmp_path), "2024-06-01T00:00:00", records=records)
+    _, columns = next(iter_snapshots(str(tmp_path), "2024-06-01", "2024-06-02"))
+
+    rows = locate(columns, 1, np.array(["2024-06-28", "2024-06-28", "2024-06-28", "2024-07-26", "2024-06-28"],
+                                       dtype="datetime64[D]"),
+                  np.array([True, True, True, False, True]), np.array([2500.002, 2500.001, 12_000_000.0, 2500.0,
+                                                                       2500.0015]))
+    assert rows[-1] == -1
+    found = columns["strike"][rows[:-1]]
+    np.testing.assert_array_equal(found, [2500.002, 2500.001, 12_000_000.0, 2500.0])
+    assert (columns["underlying"][rows[:-1]] == 1).all()
+    assert not columns["is_call"][rows[3]]
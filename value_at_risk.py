@@ -0,0 +1,165 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from book import revalue_legs
+from risk import leg_risk
+
+# VaR and expected shortfall of a compiled book (book.compile_book) over a horizon of days.
+# Scenarios are log returns per underlying, shape (n_scenarios, n_underlyings) in the column order of
+# the history file. PnL is measured against today's mark, so option premiums and LP entry cancel out.
+#   historical_returns - overlapping horizon returns straight from the price history
+#   filtered_returns   - daily returns devolatilized by an EWMA volatility and rescaled to today's volatility
+#   delta_gamma_var    - parametric: Cornish-Fisher quantile of the delta-gamma PnL under normal returns
+
+
+# Daily close history: CSV with a date column and one price column per underlying, or JSON {"date": [...], "ETH": [...]}
+def load_history(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            columns = json.load(f)
+    else:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        columns = {name: [row[name] for row in rows] for name in rows[0]}
+    dates = np.array(columns.pop("date"), dtype="datetime64[D]")
+    order = np.argsort(dates)
+    prices = np.column_stack([np.asarray(values, dtype=float)[order] for values in columns.values()])
+    return {"dates": dates[order], "underlyings": list(columns), "prices": prices}
+
+
+# Overlapping log returns over horizon days, shape (n_days - horizon, n_underlyings)
+def historical_returns(prices, horizon=1):
+    log_prices = np.log(prices)
+    return log_prices[horizon:] - log_prices[:-horizon]
+
+
+# EWMA volatility of daily log returns (RiskMetrics recursion), one row per return
+def ewma_volatility(returns, decay=0.94):
+    variance = np.empty_like(returns)
+    variance[0] = returns[:30].var(axis=0) if len(returns) > 1 else returns[0] ** 2
+    for t in range(1, len(returns)):  # Recurrence over days only, every underlying advances together
+        variance[t] = decay * variance[t - 1] + (1 - decay) * returns[t - 1] ** 2
+    return np.sqrt(variance)
+
+
+# Filtered historical simulation: standardized daily returns rescaled by today's volatility, summed over horizon days
+def filtered_returns(prices, horizon=1, decay=0.94):
+    daily = historical_returns(prices, 1)
+    volatility = ewma_volatility(daily, decay)
+    current = np.sqrt(decay * volatility[-1] ** 2 + (1 - decay) * daily[-1] ** 2)
+    scaled = daily / volatility * current
+    cumulative = np.vstack([np.zeros((1, daily.shape[1])), np.cumsum(scaled, axis=0)])
+    return cumulative[horizon:] - cumulative[:-horizon]
+
+
+# Full revaluation of every leg under every scenario, chunked over scenarios.
+# underlyings names the scenario columns; spot maps underlying -> today's price.
+# Returns book PnL (n_scenarios,) and per-position PnL (n_positions, n_scenarios).
+def revalue(arrays, spot, underlyings, scenarios, horizon=1, today=None, chunk=250):
+    today = datetime.today() if today is None else today
+    scenarios = np.atleast_2d(np.asarray(scenarios, dtype=float))
+    leg_codes = np.concatenate([arrays[kind]["underlying"] for kind in ("option", "linear", "lp")])
+    column = np.array([underlyings.index(name) for name in arrays["underlyings"]], dtype=np.intp)[leg_codes]
+    leg_spot = np.array([spot[name] for name in arrays["underlyings"]], dtype=float)[leg_codes]
+    pos = np.concatenate([arrays[kind]["pos"] for kind in ("option", "linear", "lp")])
+
+    # Legs sorted by position so per-position sums are one reduceat per chunk
+    order = np.argsort(pos, kind="stable")
+    starts = np.flatnonzero(np.r_[True, pos[order][1:] != pos[order][:-1]]) if len(pos) else np.empty(0, int)
+    value_now = revalue_legs(arrays, leg_spot[:, None], today)["pnl"]
+
+    when = today + timedelta(days=horizon)
+    position_pnl = np.zeros((len(arrays["positions"]), len(scenarios)))
+    for start in range(0, len(scenarios), chunk):
+        block = scenarios[start:start + chunk]
+        S = leg_spot[:, None] * np.exp(block[:, column].T)
+        leg_pnl = revalue_legs(arrays, S, when)["pnl"] - value_now
+        if len(starts):
+            position_pnl[pos[order][starts], start:start + len(block)] = np.add.reduceat(leg_pnl[order], starts, axis=0)
+    return {"pnl": position_pnl.sum(axis=0), "position_pnl": position_pnl}
+
+
+# VaR and expected shortfall (both reported as positive losses) of a PnL sample at a confidence level
+def var_es(pnl, level=0.99):
+    pnl = np.asarray(pnl, dtype=float)
+    var = -np.quantile(pnl, 1 - level, axis=-1)
+    tail = pnl <= -np.expand_dims(var, -1)
+    es = -np.sum(np.where(tail, pnl, 0.0), axis=-1) / np.maximum(tail.sum(axis=-1), 1)
+    return var, es
+
+
+# Parametric delta-gamma VaR / ES under normal log returns with covariance cov (daily, scaled by horizon).
+# Moments of the quadratic PnL feed a Cornish-Fisher quantile; ES averages the quantile over the tail.
+def delta_gamma_var(arrays, spot, underlyings, cov, horizon=1, today=None, level=0.99):
+    from scipy.special import ndtri  # Only needed here, so importing value_at_risk skips scipy
+
+    today = datetime.today() if today is None else today
+    legs = leg_risk(arrays, spot, [0.0], today)
+    codes = np.array([underlyings.index(name) for name in arrays["underlyings"]], dtype=np.intp)[legs["underlying"]]
+    n = len(underlyings)
+    prices = np.array([spot.get(name, np.nan) for name in underlyings], dtype=float)
+    # Dollar delta and gamma per unit log return: dS ~ S * x
+    b = np.bincount(codes, legs["delta"][:, 0], minlength=n) * np.nan_to_num(prices)
+    gamma = np.bincount(codes, legs["gamma"][:, 0], minlength=n) * np.nan_to_num(prices) ** 2
+    theta = revalue(arrays, spot, underlyings, np.zeros((1, n)), horizon, today)["pnl"][0]
+
+    sigma = np.asarray(cov, dtype=float) * horizon
+    GS = gamma[:, None] * sigma
+    mean = theta + 0.5 * np.trace(GS)
+    variance = b @ sigma @ b + 0.5 * np.trace(GS @ GS)
+    third = 3 * b @ sigma @ GS @ b + np.trace(GS @ GS @ GS)
+    fourth = 12 * b @ sigma @ GS @ GS @ b + 3 * np.trace(GS @ GS @ GS @ GS)
+    sd = np.sqrt(variance)
+    skew, kurt = third / sd**3, fourth / sd**4
+
+    # Cornish-Fisher quantiles on a fine grid of the lower tail
+    u = np.linspace(0, 1 - level, 201)[1:]
+    z = ndtri(u)
+    cf = z + (z**2 - 1) * skew / 6 + (z**3 - 3 * z) * kurt / 24 - (2 * z**3 - 5 * z) * skew**2 / 36
+    quantiles = mean + sd * cf
+    return -quantiles[-1], -quantiles.mean()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from book import add_lp, add_option, add_linear, compile_book, new_book
+
+    # python value_at_risk.py <history.csv>; without a file a synthetic ETH history is used
+    if len(sys.argv) > 1:
+        history = load_history(sys.argv[1])
+    else:
+        rng = np.random.default_rng(3)
+        returns = rng.standard_t(4, size=(1500, 1)) * 0.03
+        history = {"underlyings": ["ETH"], "prices": 2650 * np.exp(np.cumsum(returns, axis=0) - returns.sum())}
+    spot = {name: float(history["prices"][-1, i]) for i, name in enumerate(history["underlyings"])}
+
+    # The hedged LP book of book.py, plus a large block of random option positions for timing
+    today = datetime(2026, 10, 19)
+    book = new_book()
+    add_lp(book, 10000, 2336, 2150, 2600, position="LP")
+    add_option(book, "put", 2300, "03/26/2027", 0.60, 68.74, 1.2, position="Put hedge")
+    add_linear(book, 2336, -1.5, position="Short ETH")
+    rng = np.random.default_rng(4)
+    for i in range(5000):
+        add_option(book, "call" if i % 2 else "put", round(spot["ETH"] * rng.uniform(0.7, 1.3), -1),
+                   ["12/25/2026", "03/26/2027", "06/25/2027"][i % 3], rng.uniform(0.45, 0.75), 0,
+                   rng.choice([-1, 1]) * 0.01, position=f"book{i // 50}")
+    arrays = compile_book(book)
+    daily_cov = np.atleast_2d(np.cov(historical_returns(history["prices"]), rowvar=False))
+
+    for horizon in (1, 7):
+        start = time.perf_counter()
+        hs = revalue(arrays, spot, history["underlyings"], historical_returns(history["prices"], horizon), horizon, today)
+        elapsed = time.perf_counter() - start
+        fhs = revalue(arrays, spot, history["underlyings"], filtered_returns(history["prices"], horizon), horizon, today)
+        print(f"{horizon}-day 99% VaR / ES ({len(hs['pnl'])} scenarios x {len(book['option']) + 2} legs "
+              f"in {elapsed:.2f} s)")
+        print("  historical  %10.2f %10.2f" % var_es(hs["pnl"]))
+        print("  filtered HS %10.2f %10.2f" % var_es(fhs["pnl"]))
+        print("  delta-gamma %10.2f %10.2f" % delta_gamma_var(arrays, spot, history["underlyings"], daily_cov,
+                                                              horizon, today))